@@ -0,0 +1,114 @@
+import sys
+import importlib
+import numpy as np
+from supply_chain_stats import TDigest
+from supply_chain_sim_task_c2 import warm_simulation
+
+#stock bands over replications: every replication's stock step trace (irregular (time,
+#stock) points from distributor.stock_trace, see Simulation(trace=...)) is read off on a
+#common grid (hourly by default) with np.searchsorted, then goes into per grid point
+#accumulators: running sums for mean / std and one t-digest per point for the quantiles.
+#resampled rows are buffered in a fixed block and handed to the digests a block at a time,
+#so memory is the grid times (block + digest size) whatever the number of replications.
+
+
+class StockBands:
+    def __init__(self, end_time, step=1.0, compression=50, block=64):
+        self.grid = np.arange(0, end_time + step / 2, step)
+        self.digests = [TDigest(compression) for _ in self.grid]
+        self.sum = np.zeros(len(self.grid))
+        self.sum2 = np.zeros(len(self.grid))
+        self.count = 0
+        self.rows = np.empty((block, len(self.grid)))
+        self.filled = 0
+
+    #stock of one step trace at every grid point: the value of the last change at or
+    #before it (several changes at the same time: the last one wins)
+    def resample(self, trace):
+        trace = np.asarray(trace, dtype=float).reshape(-1, 2)
+        index = np.searchsorted(trace[:, 0], self.grid, side="right") - 1
+        return trace[np.maximum(index, 0), 1]
+
+    def add(self, trace):
+        row = self.resample(trace)
+        self.sum += row
+        self.sum2 += row * row
+        self.count += 1
+        self.rows[self.filled] = row
+        self.filled += 1
+        if self.filled == len(self.rows):
+            self.flush()
+
+    def flush(self):
+        if self.filled == 0:
+            return
+        block = self.rows[:self.filled]
+        for j, digest in enumerate(self.digests):
+            digest.add_many(block[:, j])
+        self.filled = 0
+
+    #bands of two sets of replications on the same grid (e.g. from pool workers)
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        for mine, theirs in zip(self.digests, other.digests):
+            mine.merge(theirs)
+        self.sum += other.sum
+        self.sum2 += other.sum2
+        self.count += other.count
+        return self
+
+    def mean(self):
+        return self.sum / self.count
+
+    def std(self):
+        mean = self.mean()
+        return np.sqrt(np.maximum(self.sum2 / self.count - mean * mean, 0.0))
+
+    def quantile(self, q):
+        self.flush()
+        return np.array([digest.quantile(q) for digest in self.digests])
+
+
+#bands of `distributor`'s total stock over the seeds, for a task module
+def stock_bands(task_module, distributor="D1", seeds=range(100), step=1.0, **options):
+    sim = warm_simulation(task_module, trace=(distributor,), **options)
+    bands = StockBands(task_module.END_TIME, step)
+    for seed in seeds:
+        sim.reset(seed)
+        sim.run()
+        bands.add(sim.distributors[distributor].stock_trace)
+    bands.flush()
+    return bands
+
+
+#mean line, median and 25-75 / 5-95 percentile bands
+def plot_bands(bands, title=None, ax=None):
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.figure(figsize=(12, 6)).gca()
+    grid = bands.grid
+    ax.fill_between(grid, bands.quantile(0.05), bands.quantile(0.95), step="post", alpha=0.2, label="5-95%")
+    ax.fill_between(grid, bands.quantile(0.25), bands.quantile(0.75), step="post", alpha=0.35, label="25-75%")
+    ax.step(grid, bands.quantile(0.5), where="post", linewidth=1.5, label="median")
+    ax.plot(grid, bands.mean(), linewidth=1, linestyle="--", label="mean")
+    ax.set_title(title or "Stock over %d replications" % bands.count)
+    ax.set_xlabel("Hours")
+    ax.set_ylabel("Units")
+    ax.grid(True)
+    ax.legend()
+    return ax
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    #python supply_chain_bands.py [task module] [distributor] [seeds]
+    module = importlib.import_module(sys.argv[1] if len(sys.argv) > 1 else "supply_chain_sim_task_a2")
+    distributor = sys.argv[2] if len(sys.argv) > 2 else "D1"
+    n = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    bands = stock_bands(module, distributor, range(n))
+    plot_bands(bands, "Stock of Distributor %s, %s, %d replications" % (distributor, module.__name__, n))
+    plt.tight_layout()
+    plt.show()
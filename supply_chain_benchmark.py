@@ -0,0 +1,184 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import platform
+import tracemalloc
+import contextlib
+from statistics import median
+import supply_chain_sim
+import supply_chain_sim_task_a2 as task_a
+import supply_chain_sim_task_b2 as task_b
+import supply_chain_sim_task_c1 as task_c
+import supply_chain_sim_task_c2 as task_c2
+from supply_chain_telemetry import Progress
+
+#performance regression gate. a fixed set of scenarios is timed with a warm-up run and
+#`repeat` measured runs (median, min and median absolute deviation of the seconds, events
+#per second from Simulation.event_counter at the fastest run: other load on the machine only
+#ever slows a run down, so the minimum is the stablest figure), then run once more under
+#tracemalloc for the peak of python allocations (caches of warm simulations dropped first,
+#so building them is counted). tracemalloc slows everything down, so that run is not timed.
+#
+#the results are compared with the baseline json kept in the repo (benchmarks/baseline.json):
+#a scenario regresses when its events per second drop, or its peak memory grows, by more
+#than the threshold. on a noisy machine the allowed drop of a scenario widens to NOISE_SIGMAS
+#robust standard deviations (1.4826 * mad / median of the seconds) of the baseline or of this
+#run, whichever is noisier, but never beyond MAX_NOISE_FACTOR times the threshold, so a real
+#slowdown still fails on a noisy run. baselines depend on the machine they were taken on, save
+#a new one (--save) and commit it when it changes.
+#
+#   python supply_chain_benchmark.py [scenario ...]          compare with the baseline, exit 1 on regression
+#   python supply_chain_benchmark.py --save [scenario ...]   measure and write the baseline
+#   options: --baseline FILE, --repeat N (5), --threshold 0.15, --memory-threshold 0.10
+
+NOISE_SIGMAS = 3
+MAX_NOISE_FACTOR = 2
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json")
+
+
+#scenarios: name -> function running it once and returning the number of events
+def single_run():
+    random.seed(0)
+    sim = supply_chain_sim.Simulation()
+    sim.run()
+    return sim.event_counter
+
+
+def strategy_runs(task_module, seeds=range(100)):
+    def run():
+        tally = Progress(len(seeds), out=None, interval=float("inf"))
+        task_c2.run_seeds(task_module, seeds, progress=tally)
+        return tally.events
+    return run
+
+
+def c2_table():
+    tally = Progress(300, out=None, interval=float("inf"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        task_c2.main(progress=tally)
+    return tally.events
+
+
+#name -> (function, executions per measurement); a single run is short, so it is timed 100
+#times in a row, about as long as the other scenarios, to average out scheduling noise
+SCENARIOS = {
+    "supply_chain_sim single run": (single_run, 100),
+    "task a 100 seeds": (strategy_runs(task_a), 1),
+    "task b 100 seeds": (strategy_runs(task_b), 1),
+    "task c 100 seeds": (strategy_runs(task_c), 1),
+    "task_c2 table": (c2_table, 1),
+}
+
+
+def measure(name, repeat=5):
+    fn, number = SCENARIOS[name]
+    fn()
+
+    seconds = []
+    events = 0
+    for _ in range(repeat):
+        events = 0
+        start = time.perf_counter()
+        for _ in range(number):
+            events += fn()
+        seconds.append((time.perf_counter() - start) / number)
+    events //= number
+
+    task_c2._warm.clear()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    middle = median(seconds)
+    return {"seconds": middle, "seconds_min": min(seconds),
+            "seconds_mad": median(abs(s - middle) for s in seconds),
+            "repeat": repeat, "events": events, "events_per_s": events / min(seconds), "peak_bytes": peak}
+
+
+def machine():
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count()}
+
+
+def run_benchmarks(names=None, repeat=5, out=sys.stdout):
+    results = {}
+    for name in names or SCENARIOS:
+        results[name] = measure(name, repeat)
+        r = results[name]
+        print("%-28s %9.4f s (min %.4f, mad %.4f) | %10.0f events/s | peak %7.1f MiB"
+              % (name, r["seconds"], r["seconds_min"], r["seconds_mad"], r["events_per_s"], r["peak_bytes"] / 2 ** 20), file=out)
+    return {"machine": machine(), "scenarios": results}
+
+
+def save_baseline(report, path=BASELINE):
+    #scenarios not measured this time keep their old baseline
+    if os.path.exists(path):
+        with open(path) as f:
+            old = json.load(f)
+        report = {"machine": report["machine"], "scenarios": dict(old["scenarios"], **report["scenarios"])}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+#relative standard deviation of the seconds of one measurement, from its mad
+def noise(result):
+    return 1.4826 * result["seconds_mad"] / result["seconds"]
+
+
+#list of (scenario, what, baseline, now) that regressed beyond the thresholds
+def compare(report, baseline, threshold=0.15, memory_threshold=0.10, out=sys.stdout):
+    if baseline["machine"] != report["machine"]:
+        print("warning: baseline taken on %s, running on %s" % (baseline["machine"], report["machine"]), file=out)
+    regressions = []
+    for name, now in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            print("%-28s no baseline" % name, file=out)
+            continue
+        speed = now["events_per_s"] / before["events_per_s"] - 1
+        memory = now["peak_bytes"] / before["peak_bytes"] - 1
+        allowed = min(max(threshold, NOISE_SIGMAS * max(noise(before), noise(now))), MAX_NOISE_FACTOR * threshold)
+        print("%-28s events/s %+6.1f%% (allowed -%.1f%%) | peak memory %+6.1f%%"
+              % (name, 100 * speed, 100 * allowed, 100 * memory), file=out)
+        if speed < -allowed:
+            regressions.append((name, "events_per_s", before["events_per_s"], now["events_per_s"]))
+        if memory > memory_threshold:
+            regressions.append((name, "peak_bytes", before["peak_bytes"], now["peak_bytes"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--baseline": BASELINE, "--repeat": "5", "--threshold": "0.15", "--memory-threshold": "0.10"}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    save = "--save" in args
+    if save:
+        args.remove("--save")
+    elif not os.path.exists(options["--baseline"]):
+        raise SystemExit("no baseline at %s, take one on this machine with --save" % options["--baseline"])
+
+    report = run_benchmarks(args or None, int(options["--repeat"]))
+    if save:
+        save_baseline(report, options["--baseline"])
+        print("baseline written to", options["--baseline"])
+    else:
+        with open(options["--baseline"]) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, float(options["--threshold"]), float(options["--memory-threshold"]))
+        if regressions:
+            for name, what, before, now in regressions:
+                print("REGRESSION %s: %s %.6g -> %.6g" % (name, what, before, now))
+            raise SystemExit(1)
@@ -0,0 +1,326 @@
+import sys
+import time
+import random
+import numpy as np
+from supply_chain_demand import VectorizedDemand
+from supply_chain_stats import ReplicationStats
+from supply_chain_kernel import KernelSimulation, njit, numba, STRATEGY_A, STRATEGY_C
+
+#time-stepped engine: one step per day instead of one event per unit. the strategies only
+#react at the daily event, so inside a day the order of events only matters for a product
+#that runs out of stock. the whole run is array state (the topology tables and result
+#arrays of KernelSimulation) and each step works on every distributor and product at once:
+#   - factory stock gets the day's production, drawn in bulk up front as independent
+#     poisson counts per factory and product (a poisson process split uniformly over the
+#     products of the factory),
+#   - the daily event of the strategy runs in array form, the same rules as the kernel,
+#   - the day's wholesaler orders (pre-generated, see VectorizedDemand) are counted per
+#     (distributor, product) cell, and every cell is settled in bulk: min(stock, demand)
+#     units are sold. only a cell that runs out while a delivery of the same day is on its
+#     way is replayed in time order.
+#
+#C, N and R follow the same law as in the event engine (see accuracy_report and
+#supply_chain_equivalence); the D1 stock log is not kept, only the per-day arrays.
+#
+#compiled with numba (optional, like the kernel) a 30-day run of a reset DailySimulation
+#takes about 0.3 ms against 45-55 ms for the event engine (150-170x), most of it drawing
+#the demand stream. without numba the same day loop runs as plain python, much slower.
+
+
+#the run from day 7 to the end. produced[day] is the factory production during day, orders
+#are sorted by time with cell = distributor * n_prod + product, day_first[day] the first
+#order of day. counters[0] gets the number of (day, cell) replayed in time order
+@njit
+def _run_days(strategy, total_days, end_time, lead, dpf, cand, ncand,
+              produced, order_times, order_cells, day_first,
+              dist_stock, fac_stock, sales, missed, reorder,
+              cost_delivery, cost_storage, total_cost, stock_total, counters):
+    n_dist = dist_stock.shape[0]
+    n_prod = dist_stock.shape[1]
+    n_fac = fac_stock.shape[0]
+    n_cells = n_dist * n_prod
+
+    #pending factory orders (a, b) and postponed orders (c), as in the kernel
+    order_cap = n_cells * (total_days + 1)
+    pending = np.empty((n_fac, order_cap, 3), dtype=np.int64)
+    n_pending = np.zeros(n_fac, dtype=np.int64)
+    orders = np.empty((n_dist, order_cap, 2), dtype=np.int64)
+    n_orders = np.zeros(n_dist, dtype=np.int64)
+
+    #deliveries on their way as (time, cell, quantity)
+    ship_time = np.empty(order_cap)
+    ship_cell = np.empty(order_cap, dtype=np.int64)
+    ship_qty = np.empty(order_cap, dtype=np.int64)
+    n_ship = 0
+
+    demand = np.zeros(n_cells, dtype=np.int64)
+    arriving = np.zeros(n_cells, dtype=np.int64)
+    replayed = 0
+
+    for day in range(7, total_days):
+        now = day * 24.0
+        last_day = day == total_days - 1
+
+        #production since the previous daily event
+        for made in range(day - 1 if day > 7 else 0, day):
+            for f in range(n_fac):
+                for p in range(n_prod):
+                    fac_stock[f, p] += produced[made, f, p]
+
+        #stock totals and storage cost
+        for d in range(n_dist):
+            total = dist_stock[d, :].sum()
+            stock_total[d, day] = total
+            cost_storage[d, day] += total
+
+        #new orders: initial stock on day 7, otherwise the strategy's reorder rule
+        for d in range(n_dist):
+            for p in range(n_prod):
+                if day == 7:
+                    qty = 10
+                elif strategy == STRATEGY_A:
+                    qty = missed[d, p] + reorder[d, p]
+                    missed[d, p] = 0
+                    reorder[d, p] = 0
+                else:
+                    qty = missed[d, p] + sales[d, day - 1, p]
+                    missed[d, p] = 0
+                if qty <= 0:
+                    continue
+
+                if strategy == STRATEGY_C:
+                    orders[d, n_orders[d], 0] = p
+                    orders[d, n_orders[d], 1] = qty
+                    n_orders[d] += 1
+                else:
+                    f = dpf[d, p]
+                    pending[f, n_pending[f], 0] = d
+                    pending[f, n_pending[f], 1] = p
+                    pending[f, n_pending[f], 2] = qty
+                    n_pending[f] += 1
+                    cost_delivery[d, day] += 10 * lead[d, f]
+
+        if strategy == STRATEGY_C:
+            #pull from the shortest lead-time factory with enough stock, else postpone
+            for d in range(n_dist):
+                kept = 0
+                for i in range(n_orders[d]):
+                    p = orders[d, i, 0]
+                    qty = orders[d, i, 1]
+                    fulfilled = False
+                    for k in range(ncand[d, p]):
+                        f = cand[d, p, k]
+                        if fac_stock[f, p] >= qty:
+                            fac_stock[f, p] -= qty
+                            if now + lead[d, f] <= end_time:
+                                ship_time[n_ship] = now + lead[d, f]
+                                ship_cell[n_ship] = d * n_prod + p
+                                ship_qty[n_ship] = qty
+                                n_ship += 1
+                            cost_delivery[d, day] += 10 * lead[d, f]
+                            fulfilled = True
+                            break
+                    if not fulfilled:
+                        orders[d, kept, 0] = p
+                        orders[d, kept, 1] = qty
+                        kept += 1
+                n_orders[d] = kept
+        else:
+            #factories fulfil their queue in order, what cannot be served waits
+            for f in range(n_fac):
+                kept = 0
+                for i in range(n_pending[f]):
+                    d = pending[f, i, 0]
+                    p = pending[f, i, 1]
+                    qty = pending[f, i, 2]
+                    if fac_stock[f, p] >= qty:
+                        fac_stock[f, p] -= qty
+                        if now + lead[d, f] <= end_time:
+                            ship_time[n_ship] = now + lead[d, f]
+                            ship_cell[n_ship] = d * n_prod + p
+                            ship_qty[n_ship] = qty
+                            n_ship += 1
+                    else:
+                        pending[f, kept, 0] = d
+                        pending[f, kept, 1] = p
+                        pending[f, kept, 2] = qty
+                        kept += 1
+                n_pending[f] = kept
+
+        for d in range(n_dist):
+            total_cost[d, day] = cost_delivery[d, day] + cost_storage[d, day]
+
+        #the day until the next daily event (the last day runs to end_time included)
+        end = end_time if last_day else now + 24.0
+        first = day_first[day]
+        stop = len(order_times) if last_day else day_first[day + 1]
+
+        demand[:] = 0
+        for i in range(first, stop):
+            demand[order_cells[i]] += 1
+        arriving[:] = 0
+        for j in range(n_ship):
+            if ship_time[j] < end or last_day:
+                arriving[ship_cell[j]] += 1
+
+        #settle every cell with demand
+        for cell in range(n_cells):
+            count = demand[cell]
+            if count == 0:
+                continue
+            d = cell // n_prod
+            p = cell % n_prod
+            stock = dist_stock[d, p]
+            if stock >= count or arriving[cell] == 0:
+                sold = min(stock, count)
+            else:
+                #stock-out with a delivery during the day: orders and deliveries in time
+                #order, deliveries first at equal times
+                replayed += 1
+                sold = 0
+                for i in range(first, stop):
+                    if order_cells[i] != cell:
+                        continue
+                    for j in range(n_ship):
+                        if ship_cell[j] == cell and ship_qty[j] > 0 and ship_time[j] <= order_times[i]:
+                            stock += ship_qty[j]
+                            #counted here, goes into the stock below with the rest
+                            ship_qty[j] = -ship_qty[j]
+                    if stock > 0:
+                        stock -= 1
+                        sold += 1
+            if sold > 0:
+                dist_stock[d, p] -= sold
+                sales[d, day, p] += sold
+                #strategy a reorders 2 units on the first sale of a product in the day
+                if strategy == STRATEGY_A and reorder[d, p] == 0:
+                    reorder[d, p] = 2
+            missed[d, p] += count - sold
+
+        #the day's deliveries go into stock, the others stay on their way
+        kept = 0
+        for j in range(n_ship):
+            if ship_time[j] < end or last_day:
+                dist_stock[ship_cell[j] // n_prod, ship_cell[j] % n_prod] += abs(ship_qty[j])
+            else:
+                ship_time[kept] = ship_time[j]
+                ship_cell[kept] = ship_cell[j]
+                ship_qty[kept] = ship_qty[j]
+                kept += 1
+        n_ship = kept
+
+    counters[0] = replayed
+
+
+class DailySimulation(KernelSimulation):
+    #same arrays and d1_cost/d1_sales as KernelSimulation, filled by the daily engine. the
+    #draws come from numpy generators seeded from the random module, so random.seed(i)
+    #keeps runs reproducible (they are not the sample paths of Simulation for that seed).
+    #reset() empties the arrays for another run, like Simulation.reset
+    def __init__(self, task_module):
+        KernelSimulation.__init__(self, task_module)
+
+        #units per day of each product of each factory: exponential gaps of 600 s on
+        #average, each unit one of the factory's products at random
+        self.production_rate = np.zeros(self.factory_stock.shape)
+        for f in range(len(self.factory_names)):
+            for j in range(self.fac_nprod[f]):
+                self.production_rate[f, self.fac_products[f, j]] += 24 * 3600 / 600 / self.fac_nprod[f]
+        self.days_replayed = 0
+
+    def reset(self, seed=None):
+        if seed is not None:
+            random.seed(seed)
+        for array in (self.dist_stock, self.factory_stock, self.sales_per_day, self.missed, self.reorder,
+                      self.cost_delivery_per_day, self.cost_storage_per_day, self.total_cost_per_day,
+                      self.stock_total_per_day):
+            array.fill(0)
+        self.days_replayed = 0
+
+    def run(self):
+        task = self.task
+        days = task.TOTAL_DAYS
+        demand = VectorizedDemand(self.distributor_names, self.products, 8 * 24, task.END_TIME)
+        rng = np.random.default_rng(random.getrandbits(64))
+        produced = rng.poisson(self.production_rate, (days,) + self.production_rate.shape)
+
+        order_times = np.array(demand.times)
+        order_cells = np.array(demand.distributor_ids, dtype=np.int64) * len(self.products) + np.array(demand.product_ids, dtype=np.int64)
+        day_first = np.searchsorted(order_times, 24.0 * np.arange(days + 1))
+        counters = np.zeros(1, dtype=np.int64)
+
+        _run_days(
+            self.strategy, days, float(task.END_TIME), self.lead, self.dpf, self.cand, self.ncand,
+            produced, order_times, order_cells, day_first,
+            self.dist_stock, self.factory_stock, self.sales_per_day, self.missed, self.reorder,
+            self.cost_delivery_per_day, self.cost_storage_per_day, self.total_cost_per_day,
+            self.stock_total_per_day, counters,
+        )
+        #production after the last daily event, as in Simulation
+        self.factory_stock += produced[days - 1]
+        self.days_replayed = int(counters[0])
+
+
+#C, N and R of D1 for one run, as in task_c2
+def d1_metrics(sim, task_module):
+    if isinstance(sim, KernelSimulation):
+        Ci = sim.d1_cost()
+        Ni = sim.d1_sales()
+    else:
+        d1 = sim.distributors["D1"]
+        Ci = d1.total_cost
+        Ni = sum(d1.sales_per_day[d][p] for d in range(task_module.TOTAL_DAYS) for p in task_module.PRODUCTS)
+    return Ci, Ni, Ci / Ni
+
+
+#compare the daily engine with the event engine (default settings) on C, N and R over the
+#same seeds: means, stds, relative error of the mean, z score of the difference of means
+#and speed (both engines reset one simulation for every seed). the two engines draw
+#different sample paths, so agreement is statistical
+def accuracy_report(task_module, seeds=range(100), out=sys.stdout):
+    engines = {"event": task_module.Simulation(), "daily": DailySimulation(task_module)}
+    stats = {}
+    seconds = {}
+    for name, sim in engines.items():
+        #one untimed run first: numba compiles (or loads) the day loop on first use
+        sim.run()
+        stats[name] = ReplicationStats()
+        start = time.perf_counter()
+        for seed in seeds:
+            sim.reset(seed)
+            sim.run()
+            Ci, Ni, Ri = d1_metrics(sim, task_module)
+            stats[name].add(C=Ci, N=Ni, R=Ri)
+        seconds[name] = (time.perf_counter() - start) / len(seeds)
+
+    event = stats["event"].summary()
+    daily = stats["daily"].summary()
+    count = len(seeds)
+    report = {"speedup": seconds["event"] / seconds["daily"],
+              "event_ms": seconds["event"] * 1e3, "daily_ms": seconds["daily"] * 1e3}
+
+    print(task_module.__name__, "- %d seeds, event %.2f ms/run, daily %.3f ms/run, %.0fx (numba %s)"
+          % (count, report["event_ms"], report["daily_ms"], report["speedup"], "on" if numba is not None else "off"), file=out)
+    print("%3s | %12s %10s | %12s %10s | %8s %6s" % ("", "event mean", "std", "daily mean", "std", "rel err", "z"), file=out)
+    for metric in ("C", "N", "R"):
+        mean_e, std_e = event[metric + "_mean"], event[metric + "_std"]
+        mean_d, std_d = daily[metric + "_mean"], daily[metric + "_std"]
+        rel = (mean_d - mean_e) / mean_e
+        se = ((std_e ** 2 + std_d ** 2) / count) ** 0.5
+        z = (mean_d - mean_e) / se if se > 0 else 0.0
+        report[metric] = {"event_mean": mean_e, "event_std": std_e, "daily_mean": mean_d, "daily_std": std_d,
+                          "rel_err": rel, "z": z}
+        print("%3s | %12.3f %10.3f | %12.3f %10.3f | %+7.2f%% %+6.2f" % (metric, mean_e, std_e, mean_d, std_d, 100 * rel, z), file=out)
+    return report
+
+
+if __name__ == "__main__":
+    import supply_chain_sim_task_a2 as task_a
+    import supply_chain_sim_task_b2 as task_b
+    import supply_chain_sim_task_c1 as task_c
+
+    #python supply_chain_daily.py [seeds]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    for module in (task_a, task_b, task_c):
+        accuracy_report(module, range(n))
+        print()
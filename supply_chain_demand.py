@@ -0,0 +1,210 @@
+import csv
+import random
+from collections import deque
+from datetime import datetime
+
+#demand source interface used by Simulation (the Wholesalers class of each task module is
+#the synthetic one):
+#   next_arrival(base_time) -> time in hours of the next wholesaler order, or None when
+#                              the source is exhausted
+#   next_order(distributors) -> (distributor name, product) of the order that just arrived
+#
+#Simulation keeps a single wholesaler event in the queue and asks for the next arrival only
+#when the current one is handled, so a source can be read lazily.
+#
+#a source that keeps a read position also has
+#   restart()                -> back to the first order
+#which Simulation.reset calls, so one source object is replayed from the start for every
+#replication of a reused Simulation.
+
+#time units accepted for numeric timestamps, in hours
+TIME_UNITS = {"hours": 1.0, "minutes": 1 / 60.0, "seconds": 1 / 3600.0}
+
+
+class TraceDemand:
+    #replays a recorded wholesaler order log. the log is read in chunks of chunk_rows rows,
+    #so only one chunk is ever in memory, whatever the size of the file.
+    #
+    #columns: time, distributor, product and optionally quantity (default 1; a row with
+    #quantity k gives k single-unit orders at the same time). time is either a number in
+    #time_unit since the start of the simulation, or an ISO date/time when origin (a
+    #datetime for simulation hour 0) is given. rows must be sorted by time.
+    #
+    #one instance is replayed in full for every replication: restart() (called by
+    #Simulation.reset) reopens the file and reads it again from the first row.
+    def __init__(self, path, chunk_rows=65536, time_unit="hours", origin=None,
+                 time_column="time", distributor_column="distributor",
+                 product_column="product", quantity_column="quantity",
+                 distributors=None, products=None):
+        if time_unit not in TIME_UNITS:
+            raise ValueError("time_unit must be one of " + ", ".join(TIME_UNITS))
+
+        self.path = str(path)
+        self.chunk_rows = chunk_rows
+        self.scale = TIME_UNITS[time_unit]
+        self.origin = origin
+        self.columns = (time_column, distributor_column, product_column, quantity_column)
+
+        #optional validation of the names found in the log
+        self.distributors = set(distributors) if distributors is not None else None
+        self.products = set(products) if products is not None else None
+
+        self.chunks = None
+        self.buffer = deque()
+        self.restart()
+
+    #back to the first row of the log, for the next replication
+    def restart(self):
+        if self.chunks is not None:
+            #closes the file of a partly read log
+            self.chunks.close()
+        if self.path.endswith(".parquet") or self.path.endswith(".pq"):
+            self.chunks = self._parquet_chunks()
+        else:
+            self.chunks = self._csv_chunks()
+
+        #current chunk as (time, distributor, product, quantity) rows
+        self.buffer.clear()
+        self.current = None
+        self.remaining = 0
+        self.last_time = None
+        self.rows_read = 0
+
+    def _csv_chunks(self):
+        time_column, distributor_column, product_column, quantity_column = self.columns
+        with open(self.path, newline="") as f:
+            reader = csv.DictReader(f)
+            has_quantity = quantity_column in (reader.fieldnames or [])
+            chunk = []
+            for row in reader:
+                quantity = int(row[quantity_column]) if has_quantity else 1
+                chunk.append((row[time_column], row[distributor_column], row[product_column], quantity))
+                if len(chunk) >= self.chunk_rows:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def _parquet_chunks(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("reading parquet order logs needs pyarrow (pip install pyarrow)")
+
+        time_column, distributor_column, product_column, quantity_column = self.columns
+        parquet = pq.ParquetFile(self.path)
+        has_quantity = quantity_column in parquet.schema_arrow.names
+        wanted = [time_column, distributor_column, product_column]
+        if has_quantity:
+            wanted.append(quantity_column)
+
+        for batch in parquet.iter_batches(batch_size=self.chunk_rows, columns=wanted):
+            data = batch.to_pydict()
+            quantities = data[quantity_column] if has_quantity else [1] * batch.num_rows
+            yield list(zip(data[time_column], data[distributor_column], data[product_column], quantities))
+
+    def _to_hours(self, value):
+        if isinstance(value, datetime):
+            stamp = value
+        elif self.origin is not None:
+            stamp = datetime.fromisoformat(str(value))
+        else:
+            return float(value) * self.scale
+        if self.origin is None:
+            raise ValueError("date/time stamps in the order log need an origin")
+        return (stamp - self.origin).total_seconds() / 3600.0
+
+    def _next_row(self):
+        if not self.buffer:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return None
+            self.buffer.extend(chunk)
+        raw_time, distributor, product, quantity = self.buffer.popleft()
+        self.rows_read += 1
+
+        time_value = self._to_hours(raw_time)
+        if time_value < 0 or (self.last_time is not None and time_value < self.last_time):
+            raise ValueError("order log row %d: time %r is not sorted / before the simulation start" % (self.rows_read, raw_time))
+        if self.distributors is not None and distributor not in self.distributors:
+            raise ValueError("order log row %d: unknown distributor %r" % (self.rows_read, distributor))
+        if self.products is not None and product not in self.products:
+            raise ValueError("order log row %d: unknown product %r" % (self.rows_read, product))
+        self.last_time = time_value
+        return time_value, distributor, product, int(quantity)
+
+    #the log sets the times itself, base_time is not used
+    def next_arrival(self, base_time):
+        if self.remaining > 1:
+            self.remaining -= 1
+            return self.current[0]
+
+        row = self._next_row()
+        while row is not None and row[3] <= 0:
+            row = self._next_row()
+        if row is None:
+            self.current = None
+            return None
+        self.current = row
+        self.remaining = row[3]
+        return row[0]
+
+    def next_order(self, distributors):
+        return self.current[1], self.current[2]
+
+
+class VectorizedDemand:
+    #synthetic wholesaler demand drawn up front with numpy: the whole stream for the horizon
+    #(same law as Wholesalers: uniform 600-3600 s gaps from `start`, uniform distributor and
+    #product) comes out of three vectorized calls. Simulation consumes it with a cursor
+    #instead of putting wholesaler events through the event queue, which is possible because
+    #demand does not depend on the state of the simulation.
+    #
+    #the draws come from a numpy generator, so runs are not the same sample paths as with
+    #Wholesalers for the same random.seed. seed=None takes a seed from the `random` module,
+    #so random.seed(i) still makes runs reproducible.
+    def __init__(self, distributors, products, start, end, seed=None):
+        import numpy as np
+
+        if seed is None:
+            seed = random.getrandbits(64)
+        rng = np.random.default_rng(seed)
+
+        self.distributor_names = list(distributors)
+        self.product_names = list(products)
+
+        #draw a bit more than the expected count (mean gap 2100 s), top up if it fell short
+        span = max(end - start, 0)
+        gaps = []
+        total = 0.0
+        while total <= span:
+            block = rng.uniform(600, 3600, int(span / (2100 / 3600.0) * 1.1) + 16) / 3600.0
+            gaps.append(block)
+            total += block.sum()
+        times = start + np.cumsum(np.concatenate(gaps))
+        times = times[times <= end]
+
+        n = len(times)
+        #plain lists: indexing them one order at a time is much cheaper than numpy scalars
+        self.times = times.tolist()
+        self.distributor_ids = rng.integers(0, len(self.distributor_names), n).tolist()
+        self.product_ids = rng.integers(0, len(self.product_names), n).tolist()
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    #back to the first order: the same draws are replayed
+    def restart(self):
+        self.cursor = 0
+
+    #the usual demand source interface as well, one order at a time
+    def next_arrival(self, base_time):
+        if self.cursor >= len(self.times):
+            return None
+        return self.times[self.cursor]
+
+    def next_order(self, distributors):
+        i = self.cursor
+        self.cursor += 1
+        return self.distributor_names[self.distributor_ids[i]], self.product_names[self.product_ids[i]]
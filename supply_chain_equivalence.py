@@ -0,0 +1,292 @@
+import sys
+import math
+import time
+import random
+from statistics import NormalDist
+import numpy as np
+import supply_chain_sim_task_a1 as task_a1
+import supply_chain_sim_task_b1 as task_b1
+import supply_chain_sim_task_a2 as task_a
+import supply_chain_sim_task_b2 as task_b
+import supply_chain_sim_task_c1 as task_c
+from supply_chain_kernel import KernelSimulation
+from supply_chain_daily import DailySimulation
+
+#differential testing of the fast paths against the reference Simulation of each task.
+#
+#exact engines draw the same random stream as the reference (same seed, same draws in the
+#same order), so every run must match bit for bit: per-day costs, sales and stock of D1,
+#final stocks of every distributor and factory, event counter and the random state after
+#the run. a mismatch names the first seed and field that differ.
+#
+#statistical engines sample the same model differently (pre-drawn demand, lumped
+#production, time-stepped days), so they are compared as distributions: over independent
+#seeds (the candidate runs seed + SEED_OFFSET), two-sample Kolmogorov-Smirnov tests on C, N,
+#R of D1 and on the D1 stock of every day, and confidence intervals of the difference of
+#means and of the log ratio of variances. all p-values of one comparison share a Bonferroni
+#correction, so a run of the whole harness has about `alpha` chance of a false alarm per
+#comparison.
+#
+#   python supply_chain_equivalence.py [seeds] [exact seeds]
+
+SEED_OFFSET = 1000003
+
+#the unoptimized originals of task a and b (same model, same random draws)
+ORIGINALS = {task_a: task_a1, task_b: task_b1}
+
+
+#what is compared for one finished run
+def observe(sim, task_module):
+    d1 = sim.distributors["D1"]
+    days = task_module.TOTAL_DAYS
+    cost = tuple(d1.total_cost_per_day[d] for d in range(days))
+    sales = tuple(tuple(d1.sales_per_day[d][p] for p in task_module.PRODUCTS) for d in range(days))
+    C = sum(cost)
+    N = sum(map(sum, sales))
+    state = {
+        "cost_per_day": cost,
+        "sales_per_day": sales,
+        "stock_per_day": tuple(d1.stock_total_per_day),
+        "distributor_stock": tuple(tuple(dist.stock[p] for p in task_module.PRODUCTS) for dist in sim.distributors.values()),
+        "factory_stock": tuple(tuple(f.stock.get(p, 0) for p in task_module.PRODUCTS) for f in sim.factories.values()),
+        "event_counter": getattr(sim, "event_counter", None),
+        "random_state": hash(random.getstate()),
+    }
+    return {"C": C, "N": N, "R": C / N if N > 0 else math.inf, "stock": state["stock_per_day"], "state": state}
+
+
+def observe_kernel(kernel, task_module):
+    days = task_module.TOTAL_DAYS
+    cost = tuple(kernel.total_cost_per_day[0].tolist())
+    sales = tuple(tuple(row) for row in kernel.sales_per_day[0, :days].tolist())
+    C = sum(cost)
+    N = sum(map(sum, sales))
+    state = {
+        "cost_per_day": cost,
+        "sales_per_day": sales,
+        #the reference list starts at the first daily event (day 7)
+        "stock_per_day": tuple(kernel.stock_total_per_day[0, 7:].tolist()),
+        "distributor_stock": tuple(tuple(row) for row in kernel.dist_stock.tolist()),
+        "factory_stock": tuple(tuple(row) for row in kernel.factory_stock.tolist()),
+        "event_counter": kernel.event_counter,
+        "random_state": hash(random.getstate()),
+    }
+    return {"C": C, "N": N, "R": C / N if N > 0 else math.inf, "stock": state["stock_per_day"], "state": state}
+
+
+#engines: make(task_module) -> run(seed) -> observation, or None if the engine does not
+#exist for that task
+def simulation_engine(**options):
+    def make(task_module):
+        def run(seed):
+            random.seed(seed)
+            sim = task_module.Simulation(**options)
+            sim.run()
+            return observe(sim, task_module)
+        return run
+    return make
+
+
+def reset_engine(task_module):
+    sim = task_module.Simulation()
+
+    def run(seed):
+        sim.reset(seed)
+        sim.run()
+        return observe(sim, task_module)
+    return run
+
+
+def original_engine(task_module):
+    original = ORIGINALS.get(task_module)
+    if original is None:
+        return None
+
+    def run(seed):
+        random.seed(seed)
+        sim = original.Simulation()
+        sim.run()
+        return observe(sim, original)
+    return run
+
+
+def kernel_engine(task_module):
+    def run(seed):
+        random.seed(seed)
+        kernel = KernelSimulation(task_module)
+        kernel.run()
+        return observe_kernel(kernel, task_module)
+    return run
+
+
+def daily_engine(task_module):
+    #one instance reset for every seed, run once before the timing starts (numba compiles
+    #or loads the day loop on first use)
+    sim = DailySimulation(task_module)
+    sim.run()
+
+    def run(seed):
+        sim.reset(seed)
+        sim.run()
+        return observe_kernel(sim, task_module)
+    return run
+
+
+REFERENCE = simulation_engine()
+
+EXACT = {
+    "original": original_engine,
+    "reset": reset_engine,
+    "calendar": simulation_engine(scheduler="calendar"),
+    "kernel": kernel_engine,
+}
+
+#fields an exact engine legitimately does not share: the originals put every delivery in
+#the event queue, the task modules only the head of each lane, so fewer events are counted
+NOT_COMPARED = {"original": ("event_counter",)}
+
+STATISTICAL = {
+    "vectorized": simulation_engine(demand="vectorized"),
+    "lumped": simulation_engine(production="lumped"),
+    "daily": daily_engine,
+}
+
+
+#first field where two observations of the same seed differ, None if they are identical
+def first_difference(reference, candidate, skip=()):
+    for field, value in reference["state"].items():
+        if field not in skip and candidate["state"][field] != value:
+            return field
+    return None
+
+
+def compare_exact(task_module, make, seeds, skip=()):
+    run = make(task_module)
+    if run is None:
+        return None
+    reference = REFERENCE(task_module)
+    for seed in seeds:
+        field = first_difference(reference(seed), run(seed), skip)
+        if field is not None:
+            return {"ok": False, "seed": seed, "field": field}
+    return {"ok": True, "seeds": len(seeds)}
+
+
+#two-sample kolmogorov-smirnov statistic and asymptotic p-value
+def ks_2samp(x, y):
+    x = np.sort(np.asarray(x, dtype=float))
+    y = np.sort(np.asarray(y, dtype=float))
+    points = np.concatenate((x, y))
+    cdf_x = np.searchsorted(x, points, side="right") / len(x)
+    cdf_y = np.searchsorted(y, points, side="right") / len(y)
+    d = float(np.abs(cdf_x - cdf_y).max())
+    n = len(x) * len(y) / (len(x) + len(y))
+    lam = (math.sqrt(n) + 0.12 + 0.11 / math.sqrt(n)) * d
+    if lam < 1e-3:
+        return d, 1.0
+    p = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return d, min(max(p, 0.0), 1.0)
+
+
+#difference of means (welch, normal approximation): estimate, confidence interval, p-value
+def mean_difference(x, y, alpha):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    diff = y.mean() - x.mean()
+    se = math.sqrt(x.var(ddof=1) / len(x) + y.var(ddof=1) / len(y))
+    if se == 0:
+        return diff, (diff, diff), 1.0 if diff == 0 else 0.0
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    p = 2 * (1 - NormalDist().cdf(abs(diff) / se))
+    return diff, (diff - z * se, diff + z * se), p
+
+
+#log of var(y) / var(x), with the kurtosis-corrected normal approximation of log sample
+#variances (no normality assumption)
+def variance_ratio(x, y, alpha):
+    def log_var(v):
+        v = np.asarray(v, dtype=float)
+        m2 = v.var()
+        if m2 == 0:
+            return -math.inf, 0.0
+        kurtosis = ((v - v.mean()) ** 4).mean() / (m2 * m2)
+        return math.log(v.var(ddof=1)), max(kurtosis - 1, 1e-12) / len(v)
+
+    lx, vx = log_var(x)
+    ly, vy = log_var(y)
+    if math.isinf(lx) or math.isinf(ly):
+        same = lx == ly
+        return 0.0 if same else math.inf, (0.0, 0.0), 1.0 if same else 0.0
+    diff = ly - lx
+    se = math.sqrt(vx + vy)
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    p = 2 * (1 - NormalDist().cdf(abs(diff) / se))
+    return diff, (diff - z * se, diff + z * se), p
+
+
+def compare_statistical(task_module, make, seeds, alpha=0.01):
+    reference_run = REFERENCE(task_module)
+    run = make(task_module)
+    start = time.perf_counter()
+    reference = [reference_run(seed) for seed in seeds]
+    reference_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    candidate = [run(seed + SEED_OFFSET) for seed in seeds]
+    candidate_seconds = time.perf_counter() - start
+
+    tests = {}
+    for metric in ("C", "N", "R"):
+        x = [o[metric] for o in reference]
+        y = [o[metric] for o in candidate]
+        tests[metric + " ks"] = ks_2samp(x, y)
+        tests[metric + " mean"] = mean_difference(x, y, alpha)
+        tests[metric + " var"] = variance_ratio(x, y, alpha)
+    #D1 stock at each daily event, the worst day
+    stock_x = np.array([o["stock"] for o in reference], dtype=float)
+    stock_y = np.array([o["stock"] for o in candidate], dtype=float)
+    day_tests = [ks_2samp(stock_x[:, j], stock_y[:, j]) for j in range(stock_x.shape[1])]
+    worst = min(range(len(day_tests)), key=lambda j: day_tests[j][1])
+    tests["stock ks (day %d)" % (worst + 7)] = day_tests[worst]
+
+    #bonferroni over every p-value computed, stock days included
+    n_tests = len(tests) - 1 + len(day_tests)
+    threshold = alpha / n_tests
+    ok = all(t[-1] >= threshold for t in tests.values())
+    return {"ok": ok, "tests": tests, "threshold": threshold,
+            "speedup": reference_seconds / candidate_seconds if candidate_seconds > 0 else math.inf}
+
+
+def run_all(seeds=range(50), exact_seeds=range(10), modules=(task_a, task_b, task_c), alpha=0.01, out=sys.stdout):
+    failures = []
+    for task_module in modules:
+        name = task_module.__name__
+        for engine, make in EXACT.items():
+            result = compare_exact(task_module, make, exact_seeds, NOT_COMPARED.get(engine, ()))
+            if result is None:
+                continue
+            if result["ok"]:
+                print("%s %-10s exact     ok (%d seeds)" % (name, engine, result["seeds"]), file=out)
+            else:
+                print("%s %-10s exact     FAIL seed %d: %s differs" % (name, engine, result["seed"], result["field"]), file=out)
+                failures.append((name, engine))
+        for engine, make in STATISTICAL.items():
+            result = compare_statistical(task_module, make, seeds, alpha)
+            print("%s %-10s statistical %s (%d seeds, p >= %.2g needed, %.1fx)"
+                  % (name, engine, "ok" if result["ok"] else "FAIL", len(seeds), result["threshold"], result["speedup"]), file=out)
+            for test, values in result["tests"].items():
+                if len(values) == 2:
+                    print("    %-20s D %.3f  p %.3f" % (test, values[0], values[1]), file=out)
+                else:
+                    diff, (low, high), p = values
+                    print("    %-20s %+10.3f  [%+.3f, %+.3f]  p %.3f" % (test, diff, low, high, p), file=out)
+            if not result["ok"]:
+                failures.append((name, engine))
+    return failures
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n_exact = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    failures = run_all(range(n), range(n_exact))
+    if failures:
+        raise SystemExit("not equivalent: " + ", ".join("%s %s" % f for f in failures))
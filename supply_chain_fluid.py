@@ -0,0 +1,231 @@
+import sys
+import math
+import random
+
+#mean-field approximation of the supply chain: instead of sampling runs, follow the expected
+#state day by day with difference equations. a (distributor, product) keeps its expected
+#stock; the demand of a stretch of the day is poisson with the expected number of orders,
+#and the sales out of it are E[min(demand, stock)], so stock-outs are accounted for on
+#average. factories are followed as fluid stock (production in, shipments out).
+#
+#the result has, per distributor, the expected stock at each daily event, the expected sales
+#per day, the fill rate and the costs (C, N and R = C / N as in task_c2). a run takes a few
+#milliseconds; validate() compares it with the monte carlo results of task_c2.
+
+STRATEGIES = ("a", "b", "c")
+
+#wholesaler orders: one every uniform(600, 3600) s, spread evenly over distributors and products
+ORDERS_PER_HOUR = 3600 / 2100.0
+
+#factory production: one unit every 600 s on average, spread evenly over its products
+UNITS_PER_HOUR = 6.0
+
+
+#E[min(D, s)] for D ~ poisson(mean), linear between integer stock levels
+def expected_min(mean, stock):
+    if stock <= 0 or mean <= 0:
+        return 0.0
+    k = int(stock)
+    pmf = math.exp(-mean)
+    cdf = pmf
+    total = 0.0
+    #E[min(D, k)] = sum of P(D > j) for j < k
+    for j in range(k):
+        total += 1 - cdf
+        pmf *= mean / (j + 1)
+        cdf += pmf
+    return total + (stock - k) * (1 - cdf)
+
+
+#strategy: "a" (reorder reorder_quantity units on the first sale of the day + missed), "b"
+#(yesterday's sales + missed, orders wait at the factory) or "c" (like b, from the factory
+#with the shortest lead time that has the stock, otherwise postponed).
+#distributor_product_factory is needed for a and b only.
+def fluid_model(strategy, products, factory_products, lead_times, distributor_product_factory=None,
+                total_days=30, first_order_day=7, first_demand_day=8, initial_quantity=10,
+                reorder_quantity=2, orders_per_hour=ORDERS_PER_HOUR, units_per_hour=UNITS_PER_HOUR):
+    if strategy not in STRATEGIES:
+        raise ValueError("strategy must be one of " + ", ".join(STRATEGIES))
+    if strategy != "c" and distributor_product_factory is None:
+        raise ValueError("strategies a and b need distributor_product_factory")
+
+    distributors = list(lead_times)
+    end_time = total_days * 24
+    demand_per_hour = orders_per_hour / (len(distributors) * len(products))
+
+    stock = {d: {p: 0.0 for p in products} for d in distributors}
+    missed = {d: {p: 0.0 for p in products} for d in distributors}
+    sold = {d: {p: 0.0 for p in products} for d in distributors}
+    #strategy a: probability that the product sold since the last daily event
+    sold_any = {d: {p: 0.0 for p in products} for d in distributors}
+    #strategy c: postponed orders per distributor, as (product, quantity)
+    postponed = {d: [] for d in distributors}
+
+    factory_stock = {f: {p: 0.0 for p in plist} for f, plist in factory_products.items()}
+    #strategies a and b: orders waiting at the factory, as [distributor, product, quantity]
+    factory_queue = {f: [] for f in factory_products}
+
+    #deliveries on their way as (time, distributor, product, quantity)
+    in_transit = []
+
+    out = {d: {"stock_per_day": [], "sales_per_day": [0.0] * total_days, "demand": 0.0,
+               "delivery_cost": 0.0, "storage_cost": 0.0} for d in distributors}
+    factory_stock_per_day = []
+
+    for day in range(total_days):
+        start = day * 24
+        #production since the previous daily event
+        if day > 0:
+            for f, plist in factory_products.items():
+                for p in plist:
+                    factory_stock[f][p] += units_per_hour * 24 / len(plist)
+
+        if day >= first_order_day:
+            #demand of the last day, for the order line probability
+            window = 24 * demand_per_hour if day - 1 >= first_demand_day else 0.0
+            line_probability = 1.0 if day == first_order_day else 1 - math.exp(-window)
+
+            shipments = []
+            for d in distributors:
+                out[d]["stock_per_day"].append(sum(stock[d].values()))
+                out[d]["storage_cost"] += sum(stock[d].values())
+
+                #orders of the day, per product
+                orders = []
+                for p in products:
+                    if day == first_order_day:
+                        quantity = initial_quantity
+                    elif strategy == "a":
+                        quantity = missed[d][p] + reorder_quantity * sold_any[d][p]
+                    else:
+                        quantity = missed[d][p] + sold[d][p]
+                    missed[d][p] = 0.0
+                    sold_any[d][p] = 0.0
+                    if quantity > 0:
+                        orders.append((p, quantity))
+
+                if strategy == "c":
+                    #postponed orders are whole orders, they go out with certainty once filled
+                    pending = [(p, q, 1.0) for p, q in postponed[d]] + [(p, q, line_probability) for p, q in orders]
+                    postponed[d] = []
+                    for p, quantity, probability in pending:
+                        candidates = sorted((f for f, plist in factory_products.items() if p in plist),
+                                            key=lambda f: lead_times[d][f])
+                        for f in candidates:
+                            if factory_stock[f][p] >= quantity:
+                                factory_stock[f][p] -= quantity
+                                shipments.append((start + lead_times[d][f], d, p, quantity))
+                                out[d]["delivery_cost"] += 10 * lead_times[d][f] * probability
+                                break
+                        else:
+                            postponed[d].append((p, quantity))
+                else:
+                    for p, quantity in orders:
+                        f = distributor_product_factory[d][p]
+                        factory_queue[f].append([d, p, quantity])
+                        out[d]["delivery_cost"] += 10 * lead_times[d][f] * line_probability
+
+            #factories fill what they can of their queue, in order
+            if strategy != "c":
+                for f, queue in factory_queue.items():
+                    remaining = []
+                    for d, p, quantity in queue:
+                        if factory_stock[f][p] >= quantity:
+                            factory_stock[f][p] -= quantity
+                            shipments.append((start + lead_times[d][f], d, p, quantity))
+                        else:
+                            remaining.append([d, p, quantity])
+                    factory_queue[f] = remaining
+
+            in_transit.extend(s for s in shipments if s[0] <= end_time)
+        factory_stock_per_day.append({f: sum(s.values()) for f, s in factory_stock.items()})
+
+        if day < first_demand_day:
+            #no demand yet: deliveries simply arrive
+            for item in [s for s in in_transit if s[0] < start + 24]:
+                stock[item[1]][item[2]] += item[3]
+                in_transit.remove(item)
+            continue
+
+        #the day is cut at delivery times; each piece has its own poisson demand
+        arriving = sorted(s for s in in_transit if s[0] < start + 24)
+        in_transit = [s for s in in_transit if s[0] >= start + 24]
+        for d in distributors:
+            for p in products:
+                cuts = [(t, q) for t, dist, prod, q in arriving if dist == d and prod == p]
+                level = stock[d][p]
+                sales = 0.0
+                last = start
+                for t, q in cuts + [(start + 24, 0.0)]:
+                    mean = demand_per_hour * (t - last)
+                    s = expected_min(mean, level)
+                    sales += s
+                    missed[d][p] += mean - s
+                    level += q - s
+                    last = t
+                stock[d][p] = level
+                sold[d][p] = sales
+                sold_any[d][p] = 1 - math.exp(-sales)
+                out[d]["sales_per_day"][day] = out[d]["sales_per_day"][day] + sales
+                out[d]["demand"] += demand_per_hour * 24
+
+    for d in distributors:
+        r = out[d]
+        r["C"] = r["delivery_cost"] + r["storage_cost"]
+        r["N"] = sum(r["sales_per_day"])
+        r["R"] = r["C"] / r["N"] if r["N"] > 0 else math.inf
+        r["fill_rate"] = r["N"] / r["demand"] if r["demand"] > 0 else 1.0
+    out["factory_stock_per_day"] = factory_stock_per_day
+    return out
+
+
+#fluid model with the tables of a task module (the strategy of task_a2 / b2 / c1)
+def fluid_model_for(task_module, strategy, **params):
+    return fluid_model(strategy, task_module.PRODUCTS, task_module.FACTORY_PRODUCTS, task_module.LEAD_TIMES,
+                       getattr(task_module, "DISTRIBUTOR_PRODUCT_FACTORY", None),
+                       total_days=task_module.TOTAL_DAYS, **params)
+
+
+#validation harness: fluid C, N, R of D1 against the monte carlo means of task_c2 (same
+#seeds), plus the largest gap in the D1 stock trajectory, per strategy
+def validate(seeds=range(100), out=sys.stdout):
+    import time
+    import supply_chain_sim_task_a2 as task_a
+    import supply_chain_sim_task_b2 as task_b
+    import supply_chain_sim_task_c1 as task_c
+    import supply_chain_sim_task_c2 as task_c2
+
+    report = {}
+    print("%-8s | %7s | %12s %12s %8s | %s" % ("strategy", "metric", "monte carlo", "fluid", "rel err", "stock trajectory"), file=out)
+    for strategy, module in (("a", task_a), ("b", task_b), ("c", task_c)):
+        start = time.perf_counter()
+        fluid = fluid_model_for(module, strategy)
+        fluid_ms = (time.perf_counter() - start) * 1e3
+        mc = task_c2.experiments(module, seeds)
+
+        #mean D1 stock at each daily event over the same seeds
+        days = module.TOTAL_DAYS - 7
+        mean_stock = [0.0] * days
+        for seed in seeds:
+            random.seed(seed)
+            sim = module.Simulation()
+            sim.run()
+            for i, v in enumerate(sim.distributors["D1"].stock_total_per_day):
+                mean_stock[i] += v / len(seeds)
+        gaps = [abs(f - m) for f, m in zip(fluid["D1"]["stock_per_day"], mean_stock)]
+        worst = max(range(days), key=gaps.__getitem__)
+
+        report[strategy] = {"fluid_ms": fluid_ms, "stock_max_abs_err": gaps[worst], "stock_worst_day": worst + 7}
+        for metric in ("C", "N", "R"):
+            rel = (fluid["D1"][metric] - mc[metric + "_mean"]) / mc[metric + "_mean"]
+            report[strategy][metric] = {"monte_carlo": mc[metric + "_mean"], "fluid": fluid["D1"][metric], "rel_err": rel}
+            note = ""
+            if metric == "C":
+                note = "max |err| %.1f units on day %d, fluid run %.1f ms" % (gaps[worst], worst + 7, fluid_ms)
+            print("%-8s | %7s | %12.3f %12.3f %+7.2f%% | %s" % (strategy, metric, mc[metric + "_mean"], fluid["D1"][metric], 100 * rel, note), file=out)
+    return report
+
+
+if __name__ == "__main__":
+    #python supply_chain_fluid.py [seeds]
+    validate(range(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
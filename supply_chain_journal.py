@@ -0,0 +1,111 @@
+import os
+import json
+import time
+from multiprocessing import Pool
+from supply_chain_stats import ReplicationStats
+
+#append-only journal of finished replications, one json line per (strategy, seed):
+#   {"strategy": "supply_chain_sim_task_a2", "seed": 17, "C": ..., "N": ..., "R": ...}
+#lines are written as soon as a seed (or a pool worker's batch) is done and fsync'ed every
+#fsync_every records or fsync_seconds seconds, so a crash loses at most the records since
+#the last fsync, i.e. about one in-flight batch. a half-written last line (crash in the
+#middle of a write) is dropped when the journal is opened again.
+
+
+class Journal:
+    def __init__(self, path, fsync_every=100, fsync_seconds=5.0):
+        self.path = str(path)
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+
+        #{strategy: {seed: {"C": ..., "N": ..., "R": ...}}} of everything in the file
+        self.cells = {}
+        self._load()
+
+        self.file = open(self.path, "a")
+        self.unsynced = 0
+        self.last_sync = time.time()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.cells.setdefault(record["strategy"], {})[record["seed"]] = {k: record[k] for k in ("C", "N", "R")}
+                good += len(line)
+        #cut a torn tail so new records start on a fresh line
+        if good < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+
+    def done(self, strategy):
+        return set(self.cells.get(strategy, ()))
+
+    def append(self, strategy, seed, C, N, R):
+        self.file.write(json.dumps({"strategy": strategy, "seed": seed, "C": C, "N": N, "R": R}) + "\n")
+        self.cells.setdefault(strategy, {})[seed] = {"C": C, "N": N, "R": R}
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.time() - self.last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.time()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    #aggregate of the given seeds (all journaled seeds if None), added in seed order
+    def stats(self, strategy, seeds=None):
+        cells = self.cells.get(strategy, {})
+        stats = ReplicationStats()
+        for seed in sorted(cells if seeds is None else seeds):
+            stats.add(**cells[seed])
+        return stats
+
+
+#run the seeds of task_module that the journal does not have yet, journaling each one, and
+#return the statistics of all the seeds rebuilt from the journal. progress (a
+#supply_chain_telemetry.Progress) only counts the seeds that actually run
+def run_journaled(path, task_module, seeds=range(100), workers=1, batch_size=10, progress=None):
+    from supply_chain_sim_task_c2 import run_cells, warm_simulation, _run_cells_chunk
+
+    strategy = task_module.__name__
+    seeds = list(seeds)
+    journal = Journal(path)
+    try:
+        finished = journal.done(strategy)
+        todo = [s for s in seeds if s not in finished]
+        if progress is not None:
+            progress.skip(len(seeds) - len(todo))
+        if workers <= 1:
+            sim = warm_simulation(task_module)
+            start = time.perf_counter()
+            for cell in run_cells(task_module, todo):
+                journal.append(strategy, *cell)
+                if progress is not None:
+                    now = time.perf_counter()
+                    progress.update(1, sim.event_counter, busy=now - start)
+                    start = now
+        else:
+            batches = [(strategy, todo[i:i + batch_size]) for i in range(0, len(todo), batch_size)]
+            with Pool(workers) as pool:
+                for cells, (worker, events, busy) in pool.imap_unordered(_run_cells_chunk, batches):
+                    for cell in cells:
+                        journal.append(strategy, *cell)
+                    journal.sync()
+                    if progress is not None:
+                        progress.update(len(cells), events, worker=worker, busy=busy)
+        return journal.stats(strategy, seeds)
+    finally:
+        journal.close()
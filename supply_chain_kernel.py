@@ -0,0 +1,501 @@
+import sys
+import math
+import random
+import numpy as np
+import supply_chain_sim_task_a2 as task_a
+import supply_chain_sim_task_b2 as task_b
+import supply_chain_sim_task_c1 as task_c
+
+#optional numba: without it the very same kernel runs as plain python
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    njit = numba.njit(cache=True)
+else:
+    def njit(fn):
+        return fn
+
+#reorder strategies, as compiled policies
+STRATEGY_A = 0   #simple order strategy: missed + 2 units per product sold today
+STRATEGY_B = 1   #on-demand: missed + yesterday's sales, factories queue the orders
+STRATEGY_C = 2   #order delay: lead-time priority sourcing, postponed orders roll forward
+
+STRATEGIES = {task_a: STRATEGY_A, task_b: STRATEGY_B, task_c: STRATEGY_C}
+
+#event kinds
+PRODUCTION = 0
+DELIVERY = 1
+WHOLESALER = 2
+DAILY = 3
+
+#mersenne twister parameters (same generator as the random module)
+MT_N = 624
+MT_M = 397
+
+
+#the kernel replays the exact MT19937 stream of the random module, so it consumes the
+#global random state and gives the same results as Simulation for the same seed
+@njit
+def _mt_twist(mt):
+    for kk in range(MT_N):
+        y = (mt[kk] & 0x80000000) | (mt[(kk + 1) % MT_N] & 0x7fffffff)
+        v = mt[(kk + MT_M) % MT_N] ^ (y >> 1)
+        if y & 1:
+            v ^= 0x9908b0df
+        mt[kk] = v
+
+
+@njit
+def _genrand(mt, pos):
+    if pos[0] >= MT_N:
+        _mt_twist(mt)
+        pos[0] = 0
+    y = mt[pos[0]]
+    pos[0] += 1
+    y ^= y >> 11
+    y ^= (y << 7) & 0x9d2c5680
+    y ^= (y << 15) & 0xefc60000
+    y ^= y >> 18
+    return y
+
+
+#random.random()
+@njit
+def _random(mt, pos):
+    a = _genrand(mt, pos) >> 5
+    b = _genrand(mt, pos) >> 6
+    return (a * 67108864.0 + b) * (1.0 / 9007199254740992.0)
+
+
+#random.choice(seq) -> index into seq, through random._randbelow
+@njit
+def _randbelow(mt, pos, n):
+    k = 0
+    while (n >> k) > 0:
+        k += 1
+    r = _genrand(mt, pos) >> (32 - k)
+    while r >= n:
+        r = _genrand(mt, pos) >> (32 - k)
+    return r
+
+
+@njit
+def _heap_move(h_time, h_seq, h_data, dst, src):
+    h_time[dst] = h_time[src]
+    h_seq[dst] = h_seq[src]
+    for j in range(4):
+        h_data[dst, j] = h_data[src, j]
+
+
+#event heap ordered by (time, scheduling counter)
+@njit
+def _heap_push(h_time, h_seq, h_data, size, time_value, seq, kind, a, b, c):
+    i = size
+    while i > 0:
+        parent = (i - 1) // 2
+        if h_time[parent] < time_value or (h_time[parent] == time_value and h_seq[parent] < seq):
+            break
+        _heap_move(h_time, h_seq, h_data, i, parent)
+        i = parent
+    h_time[i] = time_value
+    h_seq[i] = seq
+    h_data[i, 0] = kind
+    h_data[i, 1] = a
+    h_data[i, 2] = b
+    h_data[i, 3] = c
+    return size + 1
+
+
+@njit
+def _heap_pop(h_time, h_seq, h_data, size, out):
+    out[0] = h_data[0, 0]
+    out[1] = h_data[0, 1]
+    out[2] = h_data[0, 2]
+    out[3] = h_data[0, 3]
+    top_time = h_time[0]
+
+    size -= 1
+    last_time = h_time[size]
+    last_seq = h_seq[size]
+    i = 0
+    while True:
+        child = 2 * i + 1
+        if child >= size:
+            break
+        if child + 1 < size and (h_time[child + 1] < h_time[child] or (h_time[child + 1] == h_time[child] and h_seq[child + 1] < h_seq[child])):
+            child += 1
+        if last_time < h_time[child] or (last_time == h_time[child] and last_seq < h_seq[child]):
+            break
+        _heap_move(h_time, h_seq, h_data, i, child)
+        i = child
+    _heap_move(h_time, h_seq, h_data, i, size)
+    return size, top_time
+
+
+#add qty of product p to the delivery of lane in the current daily pass. the first shipment
+#on the lane in this pass opens a batch and queues it on the lane (FIFO, like
+#Simulation.lanes); only a batch that becomes the lane head goes into the heap
+@njit
+def _ship(h_time, h_seq, h_data, size, seq, batch_qty, batch_time, free, n_free, pass_batch, slot,
+          lane_q, lane_head, lane_count, lane, time_value, end_time, p, qty):
+    b = pass_batch[slot]
+    if b == -1:
+        if time_value <= end_time:
+            n_free -= 1
+            b = free[n_free]
+            batch_qty[b, :] = 0
+            batch_time[b] = time_value
+            ring = lane_q.shape[1]
+            lane_q[lane, (lane_head[lane] + lane_count[lane]) % ring] = b
+            lane_count[lane] += 1
+            if lane_count[lane] == 1:
+                seq += 1
+                size = _heap_push(h_time, h_seq, h_data, size, time_value, seq, DELIVERY, lane, 0, 0)
+        else:
+            #past the horizon, dropped like in schedule_delivery
+            b = -2
+        pass_batch[slot] = b
+    if b >= 0:
+        batch_qty[b, p] += qty
+    return size, seq, n_free
+
+
+@njit
+def _log_d1(log_t, log_s, n_log, time_value, dist_stock):
+    if n_log == len(log_t):
+        new_t = np.empty(2 * len(log_t))
+        new_s = np.empty(2 * len(log_s), dtype=np.int64)
+        new_t[:n_log] = log_t
+        new_s[:n_log] = log_s
+        log_t = new_t
+        log_s = new_s
+    log_t[n_log] = time_value
+    log_s[n_log] = dist_stock[0, :].sum()
+    return log_t, log_s, n_log + 1
+
+
+@njit
+def _run(strategy, mt, pos, total_days, end_time,
+         fac_products, fac_nprod, lead, dpf, cand, ncand,
+         dist_stock, fac_stock, sales, missed, reorder,
+         cost_delivery, cost_storage, total_cost, stock_total, counters):
+    n_dist = dist_stock.shape[0]
+    n_prod = dist_stock.shape[1]
+    n_fac = fac_stock.shape[0]
+
+    #array-backed heap (factory production, lane heads, wholesaler, daily events),
+    #pending factory orders (a, b) and postponed orders (c)
+    order_cap = n_dist * n_prod * (total_days + 1)
+    batch_cap = n_dist * n_fac * (total_days + 1)
+    heap_cap = batch_cap + total_days + n_fac + 16
+    h_time = np.empty(heap_cap)
+    h_seq = np.empty(heap_cap, dtype=np.int64)
+    h_data = np.empty((heap_cap, 4), dtype=np.int64)
+    size = 0
+    seq = 0
+
+    pending = np.empty((n_fac, order_cap, 3), dtype=np.int64)
+    n_pending = np.zeros(n_fac, dtype=np.int64)
+    orders = np.empty((n_dist, order_cap, 2), dtype=np.int64)
+    n_orders = np.zeros(n_dist, dtype=np.int64)
+
+    #coalesced deliveries: per-product quantities of each in-flight lane delivery, with a free list
+    batch_qty = np.zeros((batch_cap, n_prod), dtype=np.int64)
+    batch_time = np.zeros(batch_cap)
+    free = np.arange(batch_cap)
+    n_free = batch_cap
+    pass_batch = np.empty(max(n_dist, n_fac), dtype=np.int64)
+
+    #per-lane FIFO ring of batches, lane = distributor * n_fac + factory
+    lane_q = np.empty((n_dist * n_fac, total_days + 2), dtype=np.int64)
+    lane_head = np.zeros(n_dist * n_fac, dtype=np.int64)
+    lane_count = np.zeros(n_dist * n_fac, dtype=np.int64)
+
+    log_t = np.empty(1024)
+    log_s = np.empty(1024, dtype=np.int64)
+    n_log = 0
+    event = np.empty(4, dtype=np.int64)
+    rate = 1 / 600
+
+    #first events: factory production, daily events, first wholesaler order, D1 log
+    for f in range(n_fac):
+        next_time = 0 + (-math.log(1.0 - _random(mt, pos)) / rate) / 3600.0
+        if next_time <= end_time:
+            seq += 1
+            size = _heap_push(h_time, h_seq, h_data, size, next_time, seq, PRODUCTION, f, 0, 0)
+    for d in range(7, total_days):
+        seq += 1
+        size = _heap_push(h_time, h_seq, h_data, size, d * 24.0, seq, DAILY, d, 0, 0)
+    next_time = 8 * 24 + (600 + 3000 * _random(mt, pos)) / 3600.0
+    if next_time <= end_time:
+        seq += 1
+        size = _heap_push(h_time, h_seq, h_data, size, next_time, seq, WHOLESALER, 0, 0, 0)
+    log_t, log_s, n_log = _log_d1(log_t, log_s, n_log, 0.0, dist_stock)
+
+    processed = 0
+    while size > 0:
+        size, now = _heap_pop(h_time, h_seq, h_data, size, event)
+        if now > end_time:
+            break
+        processed += 1
+        kind = event[0]
+
+        if kind == PRODUCTION:
+            f = event[1]
+            fac_stock[f, fac_products[f, _randbelow(mt, pos, fac_nprod[f])]] += 1
+            next_time = now + (-math.log(1.0 - _random(mt, pos)) / rate) / 3600.0
+            if next_time <= end_time:
+                seq += 1
+                size = _heap_push(h_time, h_seq, h_data, size, next_time, seq, PRODUCTION, f, 0, 0)
+
+        elif kind == DELIVERY:
+            lane = event[1]
+            d = lane // n_fac
+            b = lane_q[lane, lane_head[lane]]
+            lane_head[lane] = (lane_head[lane] + 1) % lane_q.shape[1]
+            lane_count[lane] -= 1
+            for p in range(n_prod):
+                dist_stock[d, p] += batch_qty[b, p]
+            free[n_free] = b
+            n_free += 1
+            if lane_count[lane] > 0:
+                seq += 1
+                size = _heap_push(h_time, h_seq, h_data, size, batch_time[lane_q[lane, lane_head[lane]]], seq, DELIVERY, lane, 0, 0)
+            if d == 0:
+                log_t, log_s, n_log = _log_d1(log_t, log_s, n_log, now, dist_stock)
+
+        elif kind == WHOLESALER:
+            day = int(now // 24)
+            d = _randbelow(mt, pos, n_dist)
+            p = _randbelow(mt, pos, n_prod)
+            if dist_stock[d, p] > 0:
+                dist_stock[d, p] -= 1
+                if strategy == STRATEGY_A and reorder[d, p] == 0:
+                    reorder[d, p] = 2
+                sales[d, day, p] += 1
+                if d == 0:
+                    log_t, log_s, n_log = _log_d1(log_t, log_s, n_log, now, dist_stock)
+            else:
+                missed[d, p] += 1
+            next_time = now + (600 + 3000 * _random(mt, pos)) / 3600.0
+            if next_time <= end_time:
+                seq += 1
+                size = _heap_push(h_time, h_seq, h_data, size, next_time, seq, WHOLESALER, 0, 0, 0)
+
+        else:
+            day = event[1]
+
+            #stock totals and storage cost
+            for d in range(n_dist):
+                total = dist_stock[d, :].sum()
+                stock_total[d, day] = total
+                cost_storage[d, day] += total
+
+            #new orders: initial stock on day 7, otherwise the strategy's reorder rule
+            for d in range(n_dist):
+                for p in range(n_prod):
+                    if day == 7:
+                        qty = 10
+                    elif strategy == STRATEGY_A:
+                        qty = missed[d, p] + reorder[d, p]
+                        missed[d, p] = 0
+                        reorder[d, p] = 0
+                    else:
+                        qty = missed[d, p] + sales[d, day - 1, p]
+                        missed[d, p] = 0
+                    if qty <= 0:
+                        continue
+
+                    if strategy == STRATEGY_C:
+                        orders[d, n_orders[d], 0] = p
+                        orders[d, n_orders[d], 1] = qty
+                        n_orders[d] += 1
+                    else:
+                        #orders go straight to the factory queue, cost is paid on ordering
+                        f = dpf[d, p]
+                        pending[f, n_pending[f], 0] = d
+                        pending[f, n_pending[f], 1] = p
+                        pending[f, n_pending[f], 2] = qty
+                        n_pending[f] += 1
+                        cost_delivery[d, day] += 10 * lead[d, f]
+
+            if strategy == STRATEGY_C:
+                #pull from the shortest lead-time factory with enough stock, else postpone
+                for d in range(n_dist):
+                    pass_batch[:] = -1
+                    kept = 0
+                    for i in range(n_orders[d]):
+                        p = orders[d, i, 0]
+                        qty = orders[d, i, 1]
+                        fulfilled = False
+                        for k in range(ncand[d, p]):
+                            f = cand[d, p, k]
+                            if fac_stock[f, p] >= qty:
+                                fac_stock[f, p] -= qty
+                                size, seq, n_free = _ship(h_time, h_seq, h_data, size, seq, batch_qty, batch_time, free, n_free,
+                                                          pass_batch, f, lane_q, lane_head, lane_count, d * n_fac + f,
+                                                          now + lead[d, f], end_time, p, qty)
+                                cost_delivery[d, day] += 10 * lead[d, f]
+                                fulfilled = True
+                                break
+                        if not fulfilled:
+                            orders[d, kept, 0] = p
+                            orders[d, kept, 1] = qty
+                            kept += 1
+                    n_orders[d] = kept
+            else:
+                #factories fulfil their queue in order, what cannot be served waits
+                for f in range(n_fac):
+                    pass_batch[:] = -1
+                    kept = 0
+                    for i in range(n_pending[f]):
+                        d = pending[f, i, 0]
+                        p = pending[f, i, 1]
+                        qty = pending[f, i, 2]
+                        if fac_stock[f, p] >= qty:
+                            fac_stock[f, p] -= qty
+                            size, seq, n_free = _ship(h_time, h_seq, h_data, size, seq, batch_qty, batch_time, free, n_free,
+                                                      pass_batch, d, lane_q, lane_head, lane_count, d * n_fac + f,
+                                                      now + lead[d, f], end_time, p, qty)
+                        else:
+                            pending[f, kept, 0] = d
+                            pending[f, kept, 1] = p
+                            pending[f, kept, 2] = qty
+                            kept += 1
+                    n_pending[f] = kept
+
+            for d in range(n_dist):
+                total_cost[d, day] = cost_delivery[d, day] + cost_storage[d, day]
+
+    counters[0] = seq
+    counters[1] = processed
+    return log_t[:n_log], log_s[:n_log]
+
+
+class KernelSimulation:
+    #array-backed (and numba compiled when available) version of the Simulation of
+    #task_module. it draws from the global random state exactly like Simulation.run,
+    #so for the same seed it gives the same costs, sales and stocks.
+    def __init__(self, task_module, strategy=None):
+        self.task = task_module
+        self.strategy = STRATEGIES[task_module] if strategy is None else strategy
+
+        self.distributor_names = list(task_module.LEAD_TIMES)
+        self.factory_names = list(task_module.FACTORY_PRODUCTS)
+        self.products = list(task_module.PRODUCTS)
+
+        n_dist = len(self.distributor_names)
+        n_fac = len(self.factory_names)
+        n_prod = len(self.products)
+        days = task_module.TOTAL_DAYS
+        product_index = {p: i for i, p in enumerate(self.products)}
+
+        #topology tables as arrays
+        self.fac_nprod = np.array([len(task_module.FACTORY_PRODUCTS[f]) for f in self.factory_names], dtype=np.int64)
+        self.fac_products = np.zeros((n_fac, self.fac_nprod.max()), dtype=np.int64)
+        for i, f in enumerate(self.factory_names):
+            for j, p in enumerate(task_module.FACTORY_PRODUCTS[f]):
+                self.fac_products[i, j] = product_index[p]
+
+        self.lead = np.array([[task_module.LEAD_TIMES[d][f] for f in self.factory_names] for d in self.distributor_names], dtype=np.float64)
+
+        #fixed sourcing table of strategies a and b (task c has none)
+        self.dpf = np.zeros((n_dist, n_prod), dtype=np.int64)
+        sourcing = getattr(task_module, "DISTRIBUTOR_PRODUCT_FACTORY", None)
+        if sourcing is not None:
+            for i, d in enumerate(self.distributor_names):
+                for j, p in enumerate(self.products):
+                    self.dpf[i, j] = self.factory_names.index(sourcing[d][p])
+
+        #strategy c candidates, sorted by lead time like send_orders_with_lead_time_priority
+        self.cand = np.zeros((n_dist, n_prod, n_fac), dtype=np.int64)
+        self.ncand = np.zeros((n_dist, n_prod), dtype=np.int64)
+        for i, d in enumerate(self.distributor_names):
+            for j, p in enumerate(self.products):
+                candidates = [f for f, plist in task_module.FACTORY_PRODUCTS.items() if p in plist]
+                candidates.sort(key=lambda f: task_module.LEAD_TIMES[d][f])
+                self.ncand[i, j] = len(candidates)
+                for k, f in enumerate(candidates):
+                    self.cand[i, j, k] = self.factory_names.index(f)
+
+        #state and results
+        self.dist_stock = np.zeros((n_dist, n_prod), dtype=np.int64)
+        self.factory_stock = np.zeros((n_fac, n_prod), dtype=np.int64)
+        self.sales_per_day = np.zeros((n_dist, days + 1, n_prod), dtype=np.int64)
+        self.missed = np.zeros((n_dist, n_prod), dtype=np.int64)
+        self.reorder = np.zeros((n_dist, n_prod), dtype=np.int64)
+        self.cost_delivery_per_day = np.zeros((n_dist, days))
+        self.cost_storage_per_day = np.zeros((n_dist, days))
+        self.total_cost_per_day = np.zeros((n_dist, days))
+        self.stock_total_per_day = np.zeros((n_dist, days), dtype=np.int64)
+        self.event_counter = 0
+        self.events_processed = 0
+        self.d1_stock_log = []
+
+    def run(self):
+        #hand the global random state to the kernel and take it back afterwards
+        version, internal, gauss = random.getstate()
+        mt = np.array(internal[:MT_N], dtype=np.int64)
+        pos = np.array([internal[MT_N]], dtype=np.int64)
+        counters = np.zeros(2, dtype=np.int64)
+
+        log_t, log_s = _run(
+            self.strategy, mt, pos, self.task.TOTAL_DAYS, float(self.task.END_TIME),
+            self.fac_products, self.fac_nprod, self.lead, self.dpf, self.cand, self.ncand,
+            self.dist_stock, self.factory_stock, self.sales_per_day, self.missed, self.reorder,
+            self.cost_delivery_per_day, self.cost_storage_per_day, self.total_cost_per_day,
+            self.stock_total_per_day, counters,
+        )
+
+        random.setstate((version, tuple(int(x) for x in mt) + (int(pos[0]),), gauss))
+        self.event_counter = int(counters[0])
+        self.events_processed = int(counters[1])
+        self.d1_stock_log = list(zip(log_t.tolist(), log_s.tolist()))
+
+    #C and N of D1, as in the experiments
+    def d1_cost(self):
+        return float(self.total_cost_per_day[0].sum())
+
+    def d1_sales(self):
+        return int(self.sales_per_day[0].sum())
+
+
+#parity check: kernel and reference Simulation from the same seed must agree exactly
+def check_parity(seeds=range(20), modules=(task_a, task_b, task_c)):
+    for task_module in modules:
+        for seed in seeds:
+            random.seed(seed)
+            sim = task_module.Simulation()
+            sim.run()
+            after_reference = random.random()
+
+            random.seed(seed)
+            kernel = KernelSimulation(task_module)
+            kernel.run()
+            after_kernel = random.random()
+
+            names = kernel.distributor_names
+            where = "%s seed %d" % (task_module.__name__, seed)
+            for i, d in enumerate(names):
+                dist = sim.distributors[d]
+                for p_i, p in enumerate(kernel.products):
+                    assert dist.stock[p] == kernel.dist_stock[i, p_i], where + ": stock " + d + " " + p
+                for day in range(task_module.TOTAL_DAYS):
+                    assert dist.total_cost_per_day[day] == kernel.total_cost_per_day[i, day], where + ": cost " + d
+                    for p_i, p in enumerate(kernel.products):
+                        assert dist.sales_per_day[day][p] == kernel.sales_per_day[i, day, p_i], where + ": sales " + d
+            for i, f in enumerate(kernel.factory_names):
+                for p_i, p in enumerate(kernel.products):
+                    assert sim.factories[f].stock.get(p, 0) == kernel.factory_stock[i, p_i], where + ": factory " + f
+            assert sim.event_counter == kernel.event_counter, where + ": event counter"
+            assert sim.d1_stock_log[-1] == kernel.d1_stock_log[-1], where + ": D1 log"
+            assert after_reference == after_kernel, where + ": random state"
+
+
+if __name__ == "__main__":
+    seeds = range(int(sys.argv[1])) if len(sys.argv) > 1 else range(20)
+    check_parity(seeds)
+    print("kernel matches Simulation on %d seeds x 3 strategies (numba %s)" % (len(seeds), "on" if numba is not None else "off"))
@@ -0,0 +1,131 @@
+import sys
+import random
+import importlib
+import tracemalloc
+from collections import deque
+
+#opt-in memory report of one run. at the daily events of the chosen days (and at the end of
+#the run) it takes a tracemalloc snapshot and measures the deep size of the structures of the
+#Simulation, grouped by what they are for:
+#   event queue       event_queue and the delivery lanes
+#   per-day metrics   sales / costs / missed / stock per day of every distributor
+#   pending orders    factory order books, distributor orders (and postponed orders of c1)
+#   logs              D1 stock log and plot lists, traced stocks (Simulation(trace=...))
+#   demand            the pre-generated demand stream, if any
+#   stock             current stock and the per-product counters
+#shared objects (interned product names, small ints) are counted once, in the first group
+#that reaches them. the snapshots of the first and last point give the allocation sites
+#(file:line) whose memory grew the most over the run.
+#
+#   python supply_chain_memory.py [task module] [day ...]
+
+GROUPS = {
+    "event queue": lambda sim: [sim.event_queue, getattr(sim, "lanes", None)],
+    "per-day metrics": lambda sim: [getattr(d, name, None) for d in sim.distributors.values()
+                                    for name in ("sales_per_day", "cost_storage_per_day", "total_cost_per_day",
+                                                 "missed_per_day", "cost_per_delivery_per_day", "stock_total_per_day")],
+    "pending orders": lambda sim: [getattr(f, "pending_orders", None) for f in sim.factories.values()]
+                                  + [getattr(d, name, None) for d in sim.distributors.values()
+                                     for name in ("orders_for_factories", "postponed_orders")],
+    "logs": lambda sim: [getattr(sim, name, None) for name in ("d1_stock_log", "time", "stock_per_time")]
+                        + [getattr(d, "stock_trace", None) for d in sim.distributors.values()],
+    "demand": lambda sim: [getattr(sim, "demand_stream", None)],
+    "stock": lambda sim: [f.stock for f in sim.factories.values()]
+                         + [getattr(d, name, None) for d in sim.distributors.values()
+                            for name in ("stock", "missed_wholesaler_orders", "stock_sold_to_reorder", "touched")],
+}
+
+
+#size of obj and everything it holds: containers, and the attributes of the objects of this
+#project (schedulers, rolling windows, demand streams); other objects count their own size
+def deep_size(obj, seen):
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if o is None or id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        elif type(o).__module__.startswith("supply_chain") and hasattr(o, "__dict__"):
+            stack.append(o.__dict__)
+    return size
+
+
+class MemoryReport:
+    #hooks the daily events of sim; tracemalloc has to be tracing while it runs
+    def __init__(self, sim, days, top=10):
+        self.sim = sim
+        self.days = set(days)
+        self.top = top
+        self.points = []
+        self.first = None
+        self.last = None
+
+        handle = sim.handle_daily_order_event
+
+        def handle_daily_order_event(data):
+            if data["day"] in self.days:
+                self.measure(data["day"])
+            handle(data)
+
+        sim.handle_daily_order_event = handle_daily_order_event
+
+    def measure(self, label):
+        #snapshot before walking, so the walk's own allocations are not in it
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        traced = tracemalloc.get_traced_memory()[0]
+        seen = set()
+        groups = {name: sum(deep_size(o, seen) for o in objects(self.sim)) for name, objects in GROUPS.items()}
+        self.points.append({"day": label, "traced_bytes": traced, "groups": groups})
+        if self.first is None:
+            self.first = snapshot
+        self.last = snapshot
+
+    #call after sim.run(): last point and the top growth sites between the first and last
+    def finish(self):
+        self.measure("end")
+        stats = self.last.compare_to(self.first, "lineno")
+        self.growth = [(str(s.traceback[0]), s.size_diff, s.count_diff) for s in stats[:self.top] if s.size_diff > 0]
+        return self
+
+
+#run task_module once (seed, Simulation options) with the report on
+def memory_report(task_module, days=(7, 14, 21, 29), seed=0, top=10, **options):
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        random.seed(seed)
+        sim = task_module.Simulation(**options)
+        report = MemoryReport(sim, days, top)
+        sim.run()
+        return report.finish()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def print_report(report, out=sys.stdout):
+    names = list(GROUPS)
+    print("%6s | %12s | " % ("day", "traced") + " | ".join("%15s" % n for n in names), file=out)
+    for point in report.points:
+        print("%6s | %12d | " % (point["day"], point["traced_bytes"])
+              + " | ".join("%15d" % point["groups"][n] for n in names), file=out)
+    print("\ntop growth sites (%s -> %s)" % (report.points[0]["day"], report.points[-1]["day"]), file=out)
+    for site, size, count in report.growth:
+        print("%+12d B %+8d blocks  %s" % (size, count, site), file=out)
+
+
+if __name__ == "__main__":
+    module = importlib.import_module(sys.argv[1] if len(sys.argv) > 1 else "supply_chain_sim_task_a2")
+    days = [int(d) for d in sys.argv[2:]] or [7, 14, 21, 29]
+    print_report(memory_report(module, days))
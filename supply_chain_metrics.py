@@ -0,0 +1,152 @@
+import json
+from collections import deque
+
+
+#add one day's value (a number or a {product: value} dict) into a running total
+def fold_day(total, value):
+    if isinstance(value, dict):
+        if total is None:
+            total = {}
+        for k, v in value.items():
+            total[k] = total.get(k, 0) + v
+        return total
+    return (total or 0) + value
+
+
+class RollingDays:
+    #per-day store (used like the day-indexed dicts of Distributor) that keeps only the
+    #last `window` days in memory. older days are handed to the sink and folded into a running
+    #total, so memory stays flat whatever TOTAL_DAYS is.
+    def __init__(self, make_day, window, sink=None, label=None):
+        if window < 2:
+            #strategy b and c read yesterday's sales at the daily event
+            raise ValueError("window must keep at least 2 days")
+
+        self.make_day = make_day
+        self.window = window
+        self.sink = sink
+        self.label = label
+
+        #days currently kept in memory, oldest first
+        self.days = {}
+        self.first_kept = 0
+
+        #running totals of the days already flushed
+        self.flushed = None
+
+    def _evict_before(self, first_day):
+        for d in sorted(self.days):
+            if d >= first_day:
+                break
+            value = self.days.pop(d)
+            self.flushed = fold_day(self.flushed, value)
+            if self.sink is not None:
+                self.sink(self.label, d, value)
+        self.first_kept = max(self.first_kept, first_day)
+
+    def __getitem__(self, day):
+        if day not in self.days:
+            if day < self.first_kept:
+                raise KeyError("day %d was already flushed" % day)
+            self.days[day] = self.make_day()
+            self._evict_before(day - self.window + 1)
+        return self.days[day]
+
+    def __setitem__(self, day, value):
+        if day < self.first_kept:
+            raise KeyError("day %d was already flushed" % day)
+        self.days[day] = value
+        self._evict_before(day - self.window + 1)
+
+    def __contains__(self, day):
+        return day in self.days
+
+    def __len__(self):
+        return len(self.days)
+
+    def keys(self):
+        return self.days.keys()
+
+    def values(self):
+        return self.days.values()
+
+    def items(self):
+        return self.days.items()
+
+    #sum over the whole horizon: flushed days + days still in the window
+    def total(self):
+        total = dict(self.flushed) if isinstance(self.flushed, dict) else self.flushed
+        for value in self.days.values():
+            total = fold_day(total, value)
+        if total is None:
+            return self.make_day()
+        return total
+
+    #push every day still in memory to the sink, e.g. at the end of a run
+    def flush(self):
+        if self.days:
+            self._evict_before(max(self.days) + 1)
+
+    #empty again for a new run (without flushing)
+    def reset(self):
+        self.days.clear()
+        self.first_kept = 0
+        self.flushed = None
+
+
+class RollingList:
+    #bounded version of the per-day lists (stock_total_per_day): appends beyond `window`
+    #entries hand the oldest one to the sink. first_day is the day of the first entry
+    def __init__(self, window, sink=None, label=None, first_day=0):
+        self.window = window
+        self.sink = sink
+        self.label = label
+        self.first_day = first_day
+        self.items = deque()
+        self.count = 0
+
+    def append(self, value):
+        self.items.append(value)
+        self.count += 1
+        if len(self.items) > self.window:
+            old = self.items.popleft()
+            if self.sink is not None:
+                self.sink(self.label, self.first_day + self.count - len(self.items) - 1, old)
+
+    def flush(self):
+        while self.items:
+            old = self.items.popleft()
+            if self.sink is not None:
+                self.sink(self.label, self.first_day + self.count - len(self.items) - 1, old)
+
+    #empty again for a new run (without flushing)
+    def reset(self):
+        self.items.clear()
+        self.count = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+
+class JsonLinesSink:
+    #simple sink: one json object per flushed value, {"label": ..., "day": ..., "value": ...}
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def __call__(self, label, day, value):
+        self.file.write(json.dumps({"label": label, "day": day, "value": value}) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class NullSink:
+    #drops flushed values, only the running totals are kept
+    def __call__(self, label, day, value):
+        pass
@@ -0,0 +1,46 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+#step traces (time, stock at every change) get one point per sale and delivery, so over long
+#horizons drawing them costs more than simulating them. downsample_step keeps at most four
+#points per time bucket, the first, the last, the lowest and the highest of the bucket, in
+#time order: the drawn line still reaches every extreme (stock-outs included) and enters the
+#next bucket at the right level, and the number of points drawn only depends on buckets.
+
+
+#indices of the points to keep, at most 4 per bucket
+def downsample_indices(times, values, buckets=1000):
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    n = len(times)
+    if n <= 4 * buckets:
+        return np.arange(n)
+
+    span = times[-1] - times[0]
+    if span <= 0:
+        bucket = np.zeros(n, dtype=np.int64)
+    else:
+        bucket = np.minimum(((times - times[0]) / span * buckets).astype(np.int64), buckets - 1)
+
+    #times are sorted, so every bucket is one contiguous run of points
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    #sorted by bucket then value: the first and last of each run are its min and max
+    order = np.lexsort((values, bucket))
+    keep = np.concatenate((starts, ends, order[starts], order[ends]))
+    return np.unique(keep)
+
+
+def downsample_step(times, values, buckets=1000):
+    index = downsample_indices(times, values, buckets)
+    return np.asarray(times)[index], np.asarray(values)[index]
+
+
+#plt.step(times, values, where="post") of a downsampled trace. markers are only drawn when
+#every point is kept
+def plot_step(times, values, buckets=1000, ax=None, marker="o", **kwargs):
+    ax = ax or plt.gca()
+    x, y = downsample_step(times, values, buckets)
+    if len(x) < len(times):
+        marker = None
+    return ax.step(x, y, where="post", marker=marker, **kwargs)
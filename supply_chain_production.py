@@ -0,0 +1,48 @@
+import random
+
+
+class LumpedProduction:
+    #closed-form fast-forward of factory production. every factory makes one unit of a
+    #uniformly chosen product after exponential gaps (mean 600 s, so 6 units an hour), and
+    #factory stock is only read at daily events. so between two reads production does not
+    #interact with anything, and the whole stretch can be jumped at once: the number of
+    #units a factory made in dt hours is poisson(6 dt), and splitting them over its products
+    #is multinomial. this gives the same distribution of stocks as thousands of single
+    #production events, for two numpy draws per factory.
+    #
+    #the warm-up (hour 0 to the first daily event on day 7, nothing but production) is the
+    #first of these stretches; every day after it is one as well.
+    #
+    #the draws come from a numpy generator, so runs are not the same sample paths as with
+    #production events. seed=None takes a seed from the `random` module, so random.seed(i)
+    #still makes runs reproducible.
+    def __init__(self, factories, rate_per_hour=6.0, seed=None):
+        import numpy as np
+
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.rng = np.random.default_rng(seed)
+
+        self.factories = factories
+        self.rate = rate_per_hour
+
+        #production is accounted for up to this time
+        self.time = 0.0
+        self.units = 0
+
+    #add everything produced between the last call and to_time to the factory stocks
+    def advance(self, to_time):
+        hours = to_time - self.time
+        if hours <= 0:
+            return
+        self.time = to_time
+
+        counts = self.rng.poisson(self.rate * hours, len(self.factories)).tolist()
+        for factory, count in zip(self.factories.values(), counts):
+            if count == 0:
+                continue
+            self.units += count
+            products = factory.products_produced
+            split = self.rng.multinomial(count, [1.0 / len(products)] * len(products)).tolist()
+            for product, quantity in zip(products, split):
+                factory.stock[product] += quantity
@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import importlib
+from multiprocessing import Process
+from supply_chain_stats import ReplicationStats
+
+#work queue for replication farms, in one sqlite file. no server: every process that can
+#open the file (on one host, or on several hosts sharing a directory whose filesystem
+#supports file locks) can submit jobs or work on them.
+#
+#a job is a block of seeds of one strategy (task module + Simulation options) in a named
+#sweep. workers claim a job with a lease and renew it while they run; a job whose lease ran
+#out (worker crashed, host lost) goes back to the queue and is retried, up to max_attempts
+#claims. results are stored per (sweep, strategy, seed), the first result of a seed wins (a
+#late duplicate of a retried job is dropped), so running a seed twice never counts it twice.
+#submitting the same sweep again, with any chunking, only adds jobs for the seeds that are
+#neither finished nor in a pending or running job; a resubmission with another task module
+#or other Simulation options for a strategy already in the sweep is refused. results() only
+#aggregates the strategies and seeds asked for.
+#
+#   python supply_chain_queue.py work QUEUE [processes]   run local workers until the queue is empty
+#   python supply_chain_queue.py status QUEUE             jobs per sweep and state
+
+SCHEMA = """
+create table if not exists jobs (
+    id integer primary key,
+    sweep text not null,
+    strategy text not null,
+    module text not null,
+    options text not null,
+    seeds text not null,
+    first_seed integer not null,
+    state text not null default 'pending',
+    attempts integer not null default 0,
+    lease_until real not null default 0,
+    worker text,
+    error text,
+    unique (sweep, strategy, seeds)
+);
+create table if not exists cells (
+    sweep text not null,
+    strategy text not null,
+    seed integer not null,
+    C real not null,
+    N real not null,
+    R real not null,
+    job_id integer references jobs(id),
+    worker text,
+    finished real,
+    primary key (sweep, strategy, seed)
+);
+"""
+
+
+class WorkQueue:
+    def __init__(self, path, lease_seconds=60.0, max_attempts=3):
+        self.path = str(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        #autocommit; writes that must be atomic use explicit transactions
+        self.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    #strategies: {label: task module}, options: Simulation keyword arguments for every job
+    def submit(self, sweep, strategies, seeds, chunk_size=10, options=None):
+        seeds = list(seeds)
+        options = json.dumps(options or {}, sort_keys=True)
+        self.db.execute("begin immediate")
+        try:
+            for label, module in strategies.items():
+                name = module if isinstance(module, str) else module.__name__
+                for stored in self.db.execute("select distinct module, options from jobs where sweep = ? and strategy = ?",
+                                              (sweep, label)).fetchall():
+                    if stored != (name, options):
+                        raise ValueError("sweep %s already runs %s as %s with options %s, not %s with %s"
+                                         % (sweep, label, stored[0], stored[1], name, options))
+
+                #seeds already finished or waiting in a job are not submitted again
+                covered = {row[0] for row in self.db.execute("select seed from cells where sweep = ? and strategy = ?",
+                                                             (sweep, label))}
+                for (block,) in self.db.execute("select seeds from jobs where sweep = ? and strategy = ? "
+                                                "and state in ('pending', 'running')", (sweep, label)):
+                    covered.update(json.loads(block))
+                todo = [seed for seed in seeds if seed not in covered]
+
+                for first in range(0, len(todo), chunk_size):
+                    block = todo[first:first + chunk_size]
+                    cursor = self.db.execute("insert or ignore into jobs (sweep, strategy, module, options, seeds, first_seed) "
+                                             "values (?, ?, ?, ?, ?, ?)", (sweep, label, name, options, json.dumps(block), block[0]))
+                    if cursor.rowcount == 0:
+                        #same block as a failed job (or a done one whose seeds have no results): run it again
+                        self.db.execute("update jobs set state = 'pending', attempts = 0, lease_until = 0, error = null "
+                                        "where sweep = ? and strategy = ? and seeds = ?", (sweep, label, json.dumps(block)))
+            self.db.execute("commit")
+        except BaseException:
+            self.db.execute("rollback")
+            raise
+
+    #next job for this worker: a pending one, or a running one whose lease expired. None if
+    #there is nothing to do right now
+    def claim(self, worker):
+        now = time.time()
+        self.db.execute("begin immediate")
+        try:
+            row = self.db.execute("select id, sweep, strategy, module, options, seeds from jobs "
+                                  "where (state = 'pending' or (state = 'running' and lease_until < ?)) "
+                                  "and attempts < ? order by id limit 1", (now, self.max_attempts)).fetchone()
+            if row is not None:
+                self.db.execute("update jobs set state = 'running', attempts = attempts + 1, lease_until = ?, worker = ? "
+                                "where id = ?", (now + self.lease_seconds, worker, row[0]))
+            self._reap(now)
+            self.db.execute("commit")
+        except BaseException:
+            self.db.execute("rollback")
+            raise
+        if row is None:
+            return None
+        job_id, sweep, strategy, module, options, seeds = row
+        return {"id": job_id, "sweep": sweep, "strategy": strategy, "module": module,
+                "options": json.loads(options), "seeds": json.loads(seeds)}
+
+    #jobs that used up their attempts on expired leases
+    def _reap(self, now):
+        self.db.execute("update jobs set state = 'failed', error = coalesce(error, 'lease expired') "
+                        "where state = 'running' and lease_until < ? and attempts >= ?", (now, self.max_attempts))
+
+    #mark jobs whose last lease expired as failed, for waiters when no worker claims anymore
+    def reap(self):
+        self._reap(time.time())
+
+    #extend the lease of a running job; False if the job was taken over meanwhile
+    def renew(self, job_id, worker):
+        cursor = self.db.execute("update jobs set lease_until = ? where id = ? and worker = ? and state = 'running'",
+                                 (time.time() + self.lease_seconds, job_id, worker))
+        return cursor.rowcount == 1
+
+    #cells: (seed, C, N, R) of every seed of the job
+    def complete(self, job_id, worker, cells):
+        now = time.time()
+        self.db.execute("begin immediate")
+        try:
+            sweep, strategy = self.db.execute("select sweep, strategy from jobs where id = ?", (job_id,)).fetchone()
+            self.db.executemany("insert or ignore into cells (sweep, strategy, seed, C, N, R, job_id, worker, finished) "
+                                "values (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                [(sweep, strategy, seed, C, N, R, job_id, worker, now) for seed, C, N, R in cells])
+            self.db.execute("update jobs set state = 'done', error = null where id = ?", (job_id,))
+            self.db.execute("commit")
+        except BaseException:
+            self.db.execute("rollback")
+            raise
+
+    #a job that raised goes back to the queue until it used up max_attempts
+    def fail(self, job_id, worker, error):
+        self.db.execute("update jobs set state = case when attempts >= ? then 'failed' else 'pending' end, "
+                        "error = ?, lease_until = 0 where id = ? and worker = ? and state = 'running'",
+                        (self.max_attempts, error, job_id, worker))
+
+    #{sweep: {state: count}}
+    def status(self, sweep=None):
+        query = "select sweep, state, count(*) from jobs"
+        args = ()
+        if sweep is not None:
+            query += " where sweep = ?"
+            args = (sweep,)
+        out = {}
+        for name, state, count in self.db.execute(query + " group by sweep, state", args):
+            out.setdefault(name, {})[state] = count
+        return out
+
+    def finished(self, sweep):
+        states = self.status(sweep).get(sweep, {})
+        return states.get("pending", 0) == 0 and states.get("running", 0) == 0
+
+    #ReplicationStats per strategy of a sweep, over the finished seeds among `seeds` (all if
+    #None) of the given strategies (all if None), added in seed order
+    def results(self, sweep, strategies=None, seeds=None):
+        wanted = None if seeds is None else set(seeds)
+        out = {}
+        rows = self.db.execute("select strategy, seed, C, N, R from cells where sweep = ? order by strategy, seed", (sweep,))
+        for strategy, seed, C, N, R in rows:
+            if strategies is not None and strategy not in strategies:
+                continue
+            if wanted is not None and seed not in wanted:
+                continue
+            out.setdefault(strategy, ReplicationStats()).add(C=C, N=N, R=R)
+        return out
+
+    def failures(self, sweep):
+        return self.db.execute("select strategy, seeds, attempts, error from jobs where sweep = ? and state = 'failed'",
+                               (sweep,)).fetchall()
+
+
+#(seed, C, N, R) of every seed of the job, None if the lease was lost on the way
+def run_job(job, renew=None):
+    from supply_chain_sim_task_c2 import run_cells
+
+    task_module = importlib.import_module(job["module"])
+    cells = []
+    #one seed at a time, renewing the lease in between
+    for cell in run_cells(task_module, job["seeds"], **job["options"]):
+        cells.append(cell)
+        if renew is not None and not renew():
+            return None
+    return cells
+
+
+#worker loop: take jobs until the queue has nothing left to claim. with wait=True it keeps
+#polling while other workers still hold jobs (their leases may run out)
+def work(path, worker=None, wait=False, poll_seconds=1.0, lease_seconds=60.0, max_attempts=3):
+    worker = worker or "%s:%d" % (socket.gethostname(), os.getpid())
+    queue = WorkQueue(path, lease_seconds, max_attempts)
+    done = 0
+    try:
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                busy = any(s.get("running", 0) or s.get("pending", 0) for s in queue.status().values())
+                if wait and busy:
+                    time.sleep(poll_seconds)
+                    continue
+                return done
+
+            last = [time.time()]
+
+            def renew():
+                if time.time() - last[0] > queue.lease_seconds / 3:
+                    last[0] = time.time()
+                    return queue.renew(job["id"], worker)
+                return True
+
+            try:
+                result = run_job(job, renew)
+            except Exception as e:
+                queue.fail(job["id"], worker, "%s: %s" % (type(e).__name__, e))
+                continue
+            if result is not None:
+                queue.complete(job["id"], worker, result)
+                done += 1
+    finally:
+        queue.close()
+
+
+#local worker processes on this host, until the queue is empty
+def run_workers(path, processes=1, **kwargs):
+    kwargs.setdefault("wait", True)
+    if processes <= 1:
+        return work(path, **kwargs)
+    workers = [Process(target=work, args=(path,), kwargs=kwargs) for _ in range(processes)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+
+#submit a sweep, work on it with local processes (0: leave it to workers elsewhere) and wait
+#until every job is done or failed. returns {strategy: ReplicationStats} over exactly the
+#strategies and seeds asked for
+def run_sweep(path, sweep, strategies, seeds, processes=1, chunk_size=10, options=None, poll_seconds=1.0):
+    seeds = list(seeds)
+    queue = WorkQueue(path)
+    try:
+        queue.submit(sweep, strategies, seeds, chunk_size, options)
+        if processes > 0:
+            run_workers(path, processes)
+        while True:
+            #nobody may be claiming anymore, so expired last attempts are failed here too
+            queue.reap()
+            if queue.finished(sweep):
+                break
+            time.sleep(poll_seconds)
+        #a failed job only matters if its seeds were not finished by another job since
+        results = queue.results(sweep, strategies, seeds)
+        for label in strategies:
+            done = results[label].count if label in results else 0
+            if done != len(seeds):
+                failed = [f for f in queue.failures(sweep) if f[0] == label]
+                raise RuntimeError("sweep %s: %s has %d of %d seeds, %d jobs failed%s"
+                                   % (sweep, label, done, len(seeds), len(failed), ", first: %r" % (failed[0],) if failed else ""))
+        return results
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    command, path = sys.argv[1], sys.argv[2]
+    if command == "work":
+        run_workers(path, int(sys.argv[3]) if len(sys.argv) > 3 else 1)
+    elif command == "status":
+        queue = WorkQueue(path)
+        for name, states in sorted(queue.status().items()):
+            print(name, " ".join("%s=%d" % item for item in sorted(states.items())))
+    else:
+        raise SystemExit("usage: python supply_chain_queue.py work|status QUEUE [processes]")
@@ -0,0 +1,190 @@
+import pickle
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+#structured results of simulation runs, backed by numpy arrays instead of the nested
+#per-day dicts of the distributors.
+#
+#RunResult: one run.
+#   distributors, products          names along the distributor and product axes
+#   cost_per_day[D, T]              total cost (delivery + storage) per distributor and day
+#   storage_cost_per_day[D, T]      storage part of it
+#   delivery_cost_per_day[D, T]     delivery part of it
+#   sales_per_day[D, T, P]          units sold
+#   missed_per_day[D, T]            missed wholesaler orders
+#   stock_per_day[D, T]             total stock at each daily event (0 before the first one)
+#   final_stock[D, P]               distributor stock at the end of the run
+#   factory_stock[F, P]             factory stock at the end of the run (0 for products a
+#                                   factory does not make)
+#and the scalar KPIs C, N, R of D1 (as in task_c2) plus per-distributor totals.
+#
+#ResultBatch: many runs of the same model, every array with a leading run axis. pack() and
+#unpack() move a batch from a pool worker to the parent out-of-band: pickle protocol 5 hands
+#the array buffers to a callback instead of writing them into the pickle stream, pack()
+#copies them into one shared memory block and only the stream (names, shapes, dtypes), the
+#block name and the buffer offsets go through the pool's pipe. unpack() copies the buffers
+#out of the block once, frees it, and the arrays of the batch point into those copies.
+
+FIELDS = ("cost_per_day", "storage_cost_per_day", "delivery_cost_per_day", "sales_per_day",
+          "missed_per_day", "stock_per_day", "final_stock", "factory_stock")
+
+
+class RunResult:
+    def __init__(self, distributors, products, factories, seed=None, **arrays):
+        self.distributors = tuple(distributors)
+        self.products = tuple(products)
+        self.factories = tuple(factories)
+        self.seed = seed
+        for name in FIELDS:
+            setattr(self, name, arrays[name])
+
+    #the arrays of a finished (non streaming) run of a task module Simulation, over its
+    #catalog `products` and `days` days
+    @classmethod
+    def from_simulation(cls, sim, products, days, seed=None):
+        distributors = list(sim.distributors)
+        factories = list(sim.factories)
+        n_dist = len(distributors)
+
+        cost = np.zeros((n_dist, days))
+        storage = np.zeros((n_dist, days))
+        sales = np.zeros((n_dist, days, len(products)), dtype=np.int64)
+        missed = np.zeros((n_dist, days), dtype=np.int64)
+        stock = np.zeros((n_dist, days), dtype=np.int64)
+        final_stock = np.zeros((n_dist, len(products)), dtype=np.int64)
+        factory_stock = np.zeros((len(factories), len(products)), dtype=np.int64)
+
+        for i, dist in enumerate(sim.distributors.values()):
+            if dist.window_days is not None:
+                raise ValueError("per-day results need the whole horizon, not the streaming mode")
+            cost[i] = [dist.total_cost_per_day[d] for d in range(days)]
+            storage[i] = [dist.cost_storage_per_day[d] for d in range(days)]
+            sales[i] = [[dist.sales_per_day[d][p] for p in products] for d in range(days)]
+            missed[i] = [dist.missed_per_day[d] for d in range(days)]
+            #stock_total_per_day starts at the first daily event
+            values = list(dist.stock_total_per_day)
+            stock[i, days - len(values):] = values
+            final_stock[i] = [dist.stock[p] for p in products]
+        for i, factory in enumerate(sim.factories.values()):
+            factory_stock[i] = [factory.stock.get(p, 0) for p in products]
+
+        return cls(distributors, products, factories, seed, cost_per_day=cost, storage_cost_per_day=storage,
+                   delivery_cost_per_day=cost - storage, sales_per_day=sales, missed_per_day=missed,
+                   stock_per_day=stock, final_stock=final_stock, factory_stock=factory_stock)
+
+    def index(self, distributor):
+        return self.distributors.index(distributor)
+
+    #per-distributor totals over the run
+    @property
+    def total_cost(self):
+        return self.cost_per_day.sum(axis=-1)
+
+    @property
+    def total_sales(self):
+        return self.sales_per_day.sum(axis=(-2, -1))
+
+    @property
+    def total_missed(self):
+        return self.missed_per_day.sum(axis=-1)
+
+    @property
+    def fill_rate(self):
+        sales = self.total_sales
+        demand = sales + self.total_missed
+        return np.where(demand > 0, sales / np.maximum(demand, 1), 1.0)
+
+    #C, N and R of D1
+    @property
+    def C(self):
+        return self.total_cost[..., self.index("D1")]
+
+    @property
+    def N(self):
+        return self.total_sales[..., self.index("D1")]
+
+    @property
+    def R(self):
+        return self.C / self.N
+
+
+class ResultBatch(RunResult):
+    #runs stacked along axis 0, seeds[i] is the seed of run i
+    def __init__(self, distributors, products, factories, seeds, **arrays):
+        RunResult.__init__(self, distributors, products, factories, None, **arrays)
+        self.seeds = np.asarray(seeds)
+
+    @classmethod
+    def stack(cls, results):
+        results = list(results)
+        first = results[0]
+        arrays = {name: np.stack([getattr(r, name) for r in results]) for name in FIELDS}
+        return cls(first.distributors, first.products, first.factories, [r.seed for r in results], **arrays)
+
+    #batches of the same model, one after the other
+    @classmethod
+    def concatenate(cls, batches):
+        batches = list(batches)
+        first = batches[0]
+        arrays = {name: np.concatenate([getattr(b, name) for b in batches]) for name in FIELDS}
+        return cls(first.distributors, first.products, first.factories,
+                   np.concatenate([b.seeds for b in batches]), **arrays)
+
+    def __len__(self):
+        return len(self.seeds)
+
+    #run i as a RunResult (views into the batch arrays)
+    def __getitem__(self, i):
+        return RunResult(self.distributors, self.products, self.factories, self.seeds[i].item(),
+                         **{name: getattr(self, name)[i] for name in FIELDS})
+
+
+#worker side: (pickle stream, shared memory block name, [(offset, size)] of each buffer).
+#the block belongs to whoever calls unpack() from then on, so it is taken off this process'
+#resource tracker (which would otherwise unlink it, or warn about it, when the worker exits)
+def pack(obj):
+    buffers = []
+    header = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raws = [b.raw() for b in buffers]
+    size = sum(raw.nbytes for raw in raws)
+    if size == 0:
+        return header, None, [(0, 0)] * len(raws)
+
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        spans = []
+        offset = 0
+        for raw in raws:
+            block.buf[offset:offset + raw.nbytes] = raw
+            spans.append((offset, raw.nbytes))
+            offset += raw.nbytes
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    resource_tracker.unregister(block._name, "shared_memory")
+    return header, block.name, spans
+
+
+#parent side: the object again, with writable arrays; the block is freed
+def unpack(frames):
+    header, name, spans = frames
+    if name is None:
+        return pickle.loads(header, buffers=[bytearray(0) for _ in spans])
+
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        buffers = [bytearray(block.buf[offset:offset + size]) for offset, size in spans]
+    finally:
+        block.close()
+        block.unlink()
+    return pickle.loads(header, buffers=buffers)
+
+
+#free the block of frames that will not be unpacked
+def discard(frames):
+    if frames[1] is not None:
+        block = shared_memory.SharedMemory(name=frames[1])
+        block.close()
+        block.unlink()
@@ -0,0 +1,188 @@
+import sys
+import time
+import random
+import heapq
+from bisect import insort
+from functools import partial
+
+#event schedulers for Simulation.event_queue. items are the (time, type, data) tuples of
+#Simulation.schedule_event, and every scheduler pops them in the same (time, type) order.
+#interface: push(item), pop() -> item, len(), peek() -> smallest item without removing it,
+#clear() to empty the queue for a new run
+
+
+class HeapScheduler:
+    #binary heap, O(log n) push and pop (the original event queue)
+    def __init__(self):
+        self.items = []
+        self.push = partial(heapq.heappush, self.items)
+        self.pop = partial(heapq.heappop, self.items)
+
+    def peek(self):
+        return self.items[0]
+
+    #in place: push and pop are bound to this list
+    def clear(self):
+        self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CalendarQueue:
+    #calendar queue (brown, 1988): the time axis is cut into buckets of `width` hours,
+    #wrapped around n_buckets "days" of a year. push drops an item into its day, pop
+    #walks the days from the current one. bucket count and width follow the queue size
+    #and event spacing, which gives amortized O(1) push and pop.
+    def __init__(self, n_buckets=16, width=1.0):
+        self.size = 0
+        self.min_buckets = n_buckets
+        self.initial_width = width
+        self._rebuild(n_buckets, width, [], 0.0)
+
+    def _rebuild(self, n_buckets, width, items, last_time):
+        self.n_buckets = n_buckets
+        self.width = width
+        self.buckets = [[] for _ in range(n_buckets)]
+        for item in items:
+            insort(self.buckets[int(item[0] / width) % n_buckets], item)
+        #virtual bucket of the last popped item: where the search resumes
+        self.current = int(last_time / width)
+        self.grow_at = 2 * n_buckets
+        self.shrink_at = n_buckets // 2 - 2
+
+    def _resize(self, n_buckets):
+        items = [item for bucket in self.buckets for item in bucket]
+        items.sort()
+        last_time = items[0][0] if items else self.current * self.width
+
+        #new width: 3x the mean gap between the next events, ignoring outlying gaps
+        sample = [items[i + 1][0] - items[i][0] for i in range(min(len(items) - 1, 25))]
+        width = self.width
+        if sample:
+            mean = sum(sample) / len(sample)
+            close = [g for g in sample if g <= 2 * mean]
+            if close and sum(close) > 0:
+                width = 3 * sum(close) / len(close)
+        self._rebuild(n_buckets, width, items, last_time)
+
+    def push(self, item):
+        day = int(item[0] / self.width)
+        insort(self.buckets[day % self.n_buckets], item)
+        #after a resize current sits on the smallest queued item, which can be later than
+        #an event pushed at the time of the last pop
+        if day < self.current:
+            self.current = day
+        self.size += 1
+        if self.size > self.grow_at:
+            self._resize(2 * self.n_buckets)
+
+    def peek(self):
+        return self.buckets[self._find()][0]
+
+    def clear(self):
+        self.size = 0
+        self._rebuild(self.min_buckets, self.initial_width, [], 0.0)
+
+    def pop(self):
+        index = self._find()
+        item = self.buckets[index].pop(0)
+        self.current = int(item[0] / self.width)
+        self.size -= 1
+        if self.size < self.shrink_at and self.n_buckets > self.min_buckets:
+            self._resize(self.n_buckets // 2)
+        return item
+
+    def _find(self):
+        if self.size == 0:
+            raise IndexError("pop from an empty calendar queue")
+
+        #walk one year of days from the current one: the first day whose head falls in it
+        #holds the smallest item
+        current = self.current
+        for step in range(self.n_buckets):
+            index = (current + step) % self.n_buckets
+            bucket = self.buckets[index]
+            if bucket and int(bucket[0][0] / self.width) <= current + step:
+                return index
+
+        #nothing within a year (sparse queue): direct search over the bucket heads
+        best = None
+        for index, bucket in enumerate(self.buckets):
+            if bucket and (best is None or bucket[0] < self.buckets[best][0]):
+                best = index
+        self.current = int(self.buckets[best][0][0] / self.width)
+        return best
+
+    def __len__(self):
+        return self.size
+
+
+SCHEDULERS = {"heap": HeapScheduler, "calendar": CalendarQueue}
+
+
+#"heap" / "calendar" or a scheduler instance
+def make_scheduler(scheduler):
+    if isinstance(scheduler, str):
+        if scheduler not in SCHEDULERS:
+            raise ValueError("unknown scheduler " + repr(scheduler) + ", expected one of " + ", ".join(SCHEDULERS))
+        return SCHEDULERS[scheduler]()
+    return scheduler
+
+
+#hold-model benchmark: keep n events queued, pop the next one and push a successor at a
+#gap drawn from the simulation's event mix (production ~10 min, wholesaler 10-60 min,
+#deliveries at lead offsets, daily events every 24 h)
+def _next_gap(rng):
+    kind = rng.random()
+    if kind < 0.6:
+        return rng.expovariate(6.0)
+    if kind < 0.85:
+        return rng.uniform(600, 3600) / 3600.0
+    if kind < 0.98:
+        return rng.choice((12, 13, 14, 15, 16, 16.5, 17, 18, 19, 20, 22))
+    return 24.0
+
+
+def hold_benchmark(scheduler_name, size, operations=200000, seed=0):
+    rng = random.Random(seed)
+    queue = make_scheduler(scheduler_name)
+    counter = 0
+    for _ in range(size):
+        counter += 1
+        queue.push((rng.uniform(0, 24), "event_" + str(counter), None))
+
+    gaps = [_next_gap(rng) for _ in range(1024)]
+    start = time.perf_counter()
+    for i in range(operations):
+        now = queue.pop()[0]
+        counter += 1
+        queue.push((now + gaps[i & 1023], "event_" + str(counter), None))
+    return (time.perf_counter() - start) / operations
+
+
+def simulation_benchmark(task_module, scheduler_name, seeds=range(10)):
+    start = time.perf_counter()
+    for seed in seeds:
+        random.seed(seed)
+        task_module.Simulation(scheduler=scheduler_name).run()
+    return (time.perf_counter() - start) / len(seeds)
+
+
+if __name__ == "__main__":
+    import supply_chain_sim_task_b2 as task_b
+
+    #production queue sizes: a 30-day run holds about 30-50 events (4 production events,
+    #lane heads, one wholesaler order, pending daily events); the larger sizes are for
+    #bigger networks / long horizons
+    sizes = [int(a) for a in sys.argv[1:]] or [32, 64, 1000, 10000, 100000]
+    print("hold model, ns per pop+push")
+    print("%10s | %10s | %10s" % ("size", "heap", "calendar"))
+    for size in sizes:
+        heap_ns = hold_benchmark("heap", size) * 1e9
+        calendar_ns = hold_benchmark("calendar", size) * 1e9
+        print("%10d | %10.0f | %10.0f" % (size, heap_ns, calendar_ns))
+
+    print("\nfull task b run, ms per replication")
+    for name in SCHEDULERS:
+        print("%10s | %10.1f" % (name, simulation_benchmark(task_b, name) * 1e3))
@@ -0,0 +1,102 @@
+import sys
+from itertools import count
+import supply_chain_sim_task_a2 as task_a
+import supply_chain_sim_task_b2 as task_b
+import supply_chain_sim_task_c1 as task_c
+from supply_chain_sim_task_c2 import warm_simulation, run_cells
+
+#ranking and selection of the strategy with the lowest mean R (KN procedure, Kim & Nelson
+#2001). every strategy runs the same seeds (common random numbers), first n0 of them, then
+#one more seed per stage for the strategies still in contention only. strategy i is dropped
+#as soon as its mean R is above the mean of another survivor l by more than
+#   W_il(r) = max(0, delta / (2 r) * (h^2 S_il^2 / delta^2 - r))
+#where S_il^2 is the first-stage variance of the paired differences R_i - R_l. when one
+#strategy is left it is the best with probability at least 1 - alpha, whenever the best mean
+#R is at least delta below all the others (indifference zone; closer than delta, any of
+#them is an acceptable pick).
+#
+#   python supply_chain_selection.py [alpha] [delta] [n0]
+
+STRATEGIES = {
+    "Task a (Simple order strategy)": task_a,
+    "Task b (On-demand order strategy)": task_b,
+    "Task c (Order delay strategy)": task_c,
+}
+
+
+def kn_constants(k, alpha, n0):
+    eta = ((2 * alpha / (k - 1)) ** (-2 / (n0 - 1)) - 1) / 2
+    return eta, 2 * eta * (n0 - 1)
+
+
+#strategies: {label: task module}. returns {"best", "replications": {label: n},
+#"means": {label: mean R}, "eliminated": {label: (stage, by)}, "guaranteed"}; guaranteed is
+#False when max_replications ran out first and the best mean among the survivors was taken
+def select_best(strategies=STRATEGIES, alpha=0.05, delta=1.0, n0=20, max_replications=1000, first_seed=0, progress=None):
+    labels = list(strategies)
+    k = len(labels)
+    streams = {label: run_cells(module, count(first_seed)) for label, module in strategies.items()}
+    sims = {label: warm_simulation(module) for label, module in strategies.items()}
+    values = {label: [] for label in labels}
+
+    def replicate(label):
+        seed, Ci, Ni, Ri = next(streams[label])
+        values[label].append(Ri)
+        if progress is not None:
+            progress.update(1, sims[label].event_counter)
+
+    for label in labels:
+        for _ in range(n0):
+            replicate(label)
+    if k == 1:
+        return {"best": labels[0], "replications": {labels[0]: n0}, "means": {labels[0]: sum(values[labels[0]]) / n0},
+                "eliminated": {}, "guaranteed": True}
+
+    eta, h2 = kn_constants(k, alpha, n0)
+    #first-stage variance of the paired differences
+    s2 = {}
+    for i in labels:
+        for l in labels:
+            if i != l:
+                d = [x - y for x, y in zip(values[i], values[l])]
+                mean = sum(d) / n0
+                s2[i, l] = sum((x - mean) ** 2 for x in d) / (n0 - 1)
+
+    survivors = list(labels)
+    eliminated = {}
+    r = n0
+    while True:
+        means = {label: sum(values[label]) / r for label in survivors}
+        dropped = []
+        for i in survivors:
+            for l in survivors:
+                if i == l:
+                    continue
+                w = max(0.0, delta / (2 * r) * (h2 * s2[i, l] / (delta * delta) - r))
+                if means[i] - means[l] > w:
+                    dropped.append(i)
+                    eliminated[i] = (r, l)
+                    break
+        survivors = [label for label in survivors if label not in dropped]
+        if len(survivors) == 1 or r >= max_replications:
+            break
+        for label in survivors:
+            replicate(label)
+        r += 1
+
+    means = {label: sum(v) / len(v) for label, v in values.items()}
+    return {"best": min(survivors, key=means.get), "replications": {label: len(v) for label, v in values.items()},
+            "means": means, "eliminated": eliminated, "guaranteed": len(survivors) == 1}
+
+
+if __name__ == "__main__":
+    alpha = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    delta = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    n0 = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    result = select_best(alpha=alpha, delta=delta, n0=n0)
+    for label in STRATEGIES:
+        out = result["eliminated"].get(label)
+        status = "eliminated at r=%d by %s" % out if out else "selected"
+        print("%-34s | R mean %9.3f | %4d replications | %s" % (label, result["means"][label], result["replications"][label], status))
+    print("best: %s (P(correct selection) >= %.2f if the best is %g below the rest%s)"
+          % (result["best"], 1 - alpha, delta, "" if result["guaranteed"] else "; max_replications reached"))
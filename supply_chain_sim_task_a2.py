@@ -1,7 +1,13 @@
+import math
 import random
-import heapq
+from collections import deque
 import matplotlib.pyplot as plt
-import numpy as np
+from supply_chain_metrics import RollingDays, RollingList
+from supply_chain_stats import ReplicationStats
+from supply_chain_scheduler import make_scheduler
+from supply_chain_demand import VectorizedDemand
+from supply_chain_production import LumpedProduction
+from supply_chain_results import RunResult
 
 PRODUCTS = [
     "p1",
@@ -91,6 +97,9 @@ DISTRIBUTOR_PRODUCT_FACTORY = {
     },
 }
 
+#position of each product in the catalog, to visit touched products in catalog order
+PRODUCT_INDEX = {p: i for i, p in enumerate(PRODUCTS)}
+
 TOTAL_DAYS = 30
 END_TIME = TOTAL_DAYS * 24  
 
@@ -112,6 +121,12 @@ class Factory:
         #orders waiting to be processed
         self.pending_orders = []
 
+    #back to an empty factory for a new run (Simulation.reset)
+    def reset(self):
+        for p in self.stock:
+            self.stock[p] = 0
+        self.pending_orders.clear()
+
     #produce a single random product
     def produce_one_product(self):
         chosen = random.choice(self.products_produced)
@@ -132,21 +147,21 @@ class Factory:
         #orders that remain unfulfilled
         remaining_orders = []
 
+        #fulfilled quantities per distributor: everything for one distributor leaves now
+        #on the same lane, so it travels as a single delivery
+        shipments = {}
+
         for order in self.pending_orders:
             prod = order["product"]
             qty = order["quantity"]
             dist = order["distributor"]
 
-            #if enough stock, schedule delivery
+            #if enough stock, add it to the distributor's shipment
             if self.stock.get(prod, 0) >= qty:
                 self.stock[prod] -= qty
 
-                #compute delivery time based on lead hours
-                lead_hours = LEAD_TIMES[dist][self.name]
-                delivery_time = current_time + lead_hours
-
-                #call the simulation to actually schedule event
-                schedule_delivery_fn(delivery_time, dist, prod, qty)
+                shipment = shipments.setdefault(dist, {})
+                shipment[prod] = shipment.get(prod, 0) + qty
 
             else:
                 #not enough stock, keep order for later
@@ -154,15 +169,34 @@ class Factory:
 
         self.pending_orders = remaining_orders
 
+        for dist, products in shipments.items():
+            #compute delivery time based on lead hours
+            lead_hours = LEAD_TIMES[dist][self.name]
+            delivery_time = current_time + lead_hours
+
+            #call the simulation to actually schedule event
+            schedule_delivery_fn(delivery_time, dist, products, self.name)
+
 class Distributor:
-    def __init__(self, name):
+    def __init__(self, name, window_days=None, sink=None, cost_breakdown=False):
         self.name = name
 
+        #streaming horizon mode: per-day metrics only keep the last window_days days,
+        #older days go to the sink (None = keep the whole horizon in memory)
+        self.window_days = window_days
+
         #initial stock for all products
         self.stock = {}
         for p in PRODUCTS:
             self.stock[p] = 0
 
+        #running total of self.stock, kept up to date on every sale and delivery
+        self.stock_total = 0
+
+        #products with a sale or a missed order since the last daily order event,
+        #the daily ordering and resets only visit these
+        self.touched = set()
+
         #track missed wholesaler orders
         self.missed_wholesaler_orders = {}
         for p in PRODUCTS:
@@ -172,36 +206,116 @@ class Distributor:
         self.orders_for_factories = []
 
         #sales counted per day and per product
-        self.sales_per_day = {}
-        for d in range(TOTAL_DAYS):
-            self.sales_per_day[d] = {}
-            for p in PRODUCTS:
-                self.sales_per_day[d][p] = 0
+        if window_days is None:
+            self.sales_per_day = {}
+            for d in range(TOTAL_DAYS):
+                self.sales_per_day[d] = {}
+                for p in PRODUCTS:
+                    self.sales_per_day[d][p] = 0
+        else:
+            self.sales_per_day = RollingDays(lambda: {p: 0 for p in PRODUCTS}, window_days, sink, name + ".sales_per_day")
 
         #total stock per day for plotting
-        self.stock_total_per_day = []
+        if window_days is None:
+            self.stock_total_per_day = []
+        else:
+            self.stock_total_per_day = RollingList(window_days, sink, name + ".stock_total_per_day", first_day=7)
+
+        #(time, total stock) at every stock change, only for the distributors the
+        #Simulation traces (see trace=)
+        self.stock_trace = None
 
         #products sold that require reordering (2 units)
         self.stock_sold_to_reorder = {}
         for p in PRODUCTS:
             self.stock_sold_to_reorder[p] = 0
 
-        #delivery cost per day per product
-        self.cost_per_delivery_per_day = {}
-        for d in range(TOTAL_DAYS):
-            self.cost_per_delivery_per_day[d] = {}
-            for p in PRODUCTS:
-                self.cost_per_delivery_per_day[d][p] = 0
-
-        #storage cost accumulated per day
-        self.cost_storage_per_day = {}
-        for d in range(TOTAL_DAYS):
-            self.cost_storage_per_day[d] = 0
-
-        #total cost = delivery + storage
-        self.total_cost_per_day = {}
-        for d in range(TOTAL_DAYS):
-            self.total_cost_per_day[d] = 0
+        #running cost totals of the whole run (C is total_cost), and today's delivery cost
+        self.delivery_cost_total = 0
+        self.storage_cost_total = 0
+        self.total_cost = 0
+        self.delivery_cost_today = 0
+
+        #delivery cost per day per product, only kept when cost_breakdown is asked for
+        self.cost_per_delivery_per_day = None
+        if cost_breakdown:
+            if window_days is None:
+                self.cost_per_delivery_per_day = {}
+                for d in range(TOTAL_DAYS):
+                    self.cost_per_delivery_per_day[d] = {}
+                    for p in PRODUCTS:
+                        self.cost_per_delivery_per_day[d][p] = 0
+            else:
+                self.cost_per_delivery_per_day = RollingDays(lambda: {p: 0 for p in PRODUCTS}, window_days, sink, name + ".cost_per_delivery_per_day")
+
+        if window_days is None:
+            #storage cost accumulated per day
+            self.cost_storage_per_day = {}
+            for d in range(TOTAL_DAYS):
+                self.cost_storage_per_day[d] = 0
+
+            #total cost = delivery + storage
+            self.total_cost_per_day = {}
+            for d in range(TOTAL_DAYS):
+                self.total_cost_per_day[d] = 0
+
+            #missed wholesaler orders per day (missed_wholesaler_orders is reset at every daily event)
+            self.missed_per_day = {}
+            for d in range(TOTAL_DAYS):
+                self.missed_per_day[d] = 0
+        else:
+            self.cost_storage_per_day = RollingDays(int, window_days, sink, name + ".cost_storage_per_day")
+            self.total_cost_per_day = RollingDays(int, window_days, sink, name + ".total_cost_per_day")
+            self.missed_per_day = RollingDays(int, window_days, sink, name + ".missed_per_day")
+
+    #back to the state of a new distributor for another run, zeroing the dicts and lists
+    #in place instead of building them again (Simulation.reset)
+    def reset(self):
+        zero = dict.fromkeys(PRODUCTS, 0)
+        self.stock.update(zero)
+        self.stock_total = 0
+        self.touched.clear()
+        self.missed_wholesaler_orders.update(zero)
+        self.orders_for_factories.clear()
+        self.stock_sold_to_reorder.update(zero)
+        if self.stock_trace is not None:
+            self.stock_trace.clear()
+
+        self.delivery_cost_total = 0
+        self.storage_cost_total = 0
+        self.total_cost = 0
+        self.delivery_cost_today = 0
+
+        if self.window_days is None:
+            for day in self.sales_per_day.values():
+                day.update(zero)
+            self.stock_total_per_day.clear()
+            for d in self.total_cost_per_day:
+                self.cost_storage_per_day[d] = 0
+                self.total_cost_per_day[d] = 0
+                self.missed_per_day[d] = 0
+            if self.cost_per_delivery_per_day is not None:
+                for day in self.cost_per_delivery_per_day.values():
+                    day.update(zero)
+        else:
+            self.sales_per_day.reset()
+            self.stock_total_per_day.reset()
+            self.cost_storage_per_day.reset()
+            self.total_cost_per_day.reset()
+            self.missed_per_day.reset()
+            if self.cost_per_delivery_per_day is not None:
+                self.cost_per_delivery_per_day.reset()
+
+    #streaming mode: hand everything still in memory to the sink
+    def flush_metrics(self):
+        if self.window_days is not None:
+            self.sales_per_day.flush()
+            self.stock_total_per_day.flush()
+            if self.cost_per_delivery_per_day is not None:
+                self.cost_per_delivery_per_day.flush()
+            self.cost_storage_per_day.flush()
+            self.total_cost_per_day.flush()
+            self.missed_per_day.flush()
 
     #wholesaler orders are handled immediately (no delay)
     def receive_wholesaler_order(self, product, current_time, day_index, log_fn):
@@ -209,6 +323,8 @@ class Distributor:
 
             #we can deliver
             self.stock[product] -= 1
+            self.stock_total -= 1
+            self.touched.add(product)
 
             #if this is the first sale for that product today, reorder 2 units
             if self.stock_sold_to_reorder[product] == 0:
@@ -219,10 +335,14 @@ class Distributor:
             #log only for D1
             if self.name == "D1":
                 log_fn(current_time)
+            if self.stock_trace is not None:
+                self.stock_trace.append((current_time, self.stock_total))
 
         else:
             #we had no stock, missed order
             self.missed_wholesaler_orders[product] += 1
+            self.missed_per_day[day_index] += 1
+            self.touched.add(product)
 
     #distributors place initial order on day 7 at 00:00
     def plan_initial_stock_order(self, day_index):
@@ -235,22 +355,24 @@ class Distributor:
 
     #storage cost = sum of stock for that day
     def calculate_storage_costs(self, day_index):
-        total = 0
-        for p in PRODUCTS:
-            total += self.stock[p]
+        total = self.stock_total
         self.cost_storage_per_day[day_index] += total
+        self.storage_cost_total += total
 
     def collect_all_demand_into_orders(self):
-        for product, quantity in self.missed_wholesaler_orders.items():
-            missed = quantity
+        #untouched products have nothing missed and nothing sold, only visit the touched ones
+        for product in sorted(self.touched, key=PRODUCT_INDEX.get):
+            missed = self.missed_wholesaler_orders[product]
             sold = self.stock_sold_to_reorder[product]
             total_order = missed + sold
             
             if total_order > 0:
                 self.orders_for_factories.append({"product": product, "quantity": total_order})
-        
-        self.missed_wholesaler_orders = {p: 0 for p in PRODUCTS}
-        self.stock_sold_to_reorder = {p: 0 for p in PRODUCTS}
+
+            self.missed_wholesaler_orders[product] = 0
+            self.stock_sold_to_reorder[product] = 0
+
+        self.touched.clear()
 
     def send_orders_to_factories(self, factories, day_index):
         #we pass the parameter factories from the later Simulation so the distributor uses the shared factories.
@@ -259,58 +381,106 @@ class Distributor:
         for order in self.orders_for_factories:
             target_factory = DISTRIBUTOR_PRODUCT_FACTORY[self.name][order["product"]]
             factories[target_factory].receive_order(self.name, order["product"], order["quantity"])
-            self.cost_per_delivery_per_day[day_index][order["product"]] += 10 * LEAD_TIMES[self.name][target_factory]
+
+            #delivery cost = 10 per hour of lead time, per order
+            delivery_cost = 10 * LEAD_TIMES[self.name][target_factory]
+            self.delivery_cost_today += delivery_cost
+            self.delivery_cost_total += delivery_cost
+            if self.cost_per_delivery_per_day is not None:
+                self.cost_per_delivery_per_day[day_index][order["product"]] += delivery_cost
         
         #reset orders list after sending
         self.orders_for_factories = []
 
-    def receive_delivery(self, product, quantity, current_time, day_index, log_fn):
-        self.stock[product] += quantity
+    #a delivery carries {product: quantity} for one lane
+    def receive_delivery(self, products, current_time, day_index, log_fn):
+        for product, quantity in products.items():
+            self.stock[product] += quantity
+            self.stock_total += quantity
         
         if self.name == "D1":
             log_fn(current_time)
+        if self.stock_trace is not None:
+            self.stock_trace.append((current_time, self.stock_total))
 
     def calculate_total_costs_per_day(self, day_index):
-        delivery_costs = sum(self.cost_per_delivery_per_day[day_index].values())
+        delivery_costs = self.delivery_cost_today
         storage_costs = self.cost_storage_per_day[day_index]
         
         self.total_cost_per_day[day_index] = delivery_costs + storage_costs
+        self.total_cost += delivery_costs + storage_costs
+        self.delivery_cost_today = 0
 
 
 class Wholesalers:
+    #synthetic demand source, see supply_chain_demand for the interface (and TraceDemand
+    #to replay recorded order logs instead)
+
+    #random gap between wholesaler orders (600-3600 seconds)
+    def next_arrival(self, base_time):
+        delta_hours = random.uniform(600, 3600) / 3600.0
+        return base_time + delta_hours
 
     #wholesalers creates random orders during the day
-    def create_order(self, distributors, current_time, day_index, log_fn):
+    def next_order(self, distributors):
         #we pass the parameter distributors from the later Simulation for the same reason as above with factories in the class distributor
         #keeping self.distributors inside this class would create isolated copies, which is wrong.
 
-        distributors_list = list(distributors.values())
+        distributors_list = list(distributors)
         #using a dict so we can access each distributor directly by its name (like "D1"),
         #makes everything easier to handle later in the simulation
 
         distributor = random.choice(distributors_list)
         product = random.choice(PRODUCTS)
-        distributor.receive_wholesaler_order(product, current_time, day_index, log_fn)
+        return distributor, product
 
 
 class Simulation:
-    def __init__(self):
+    #window_days/sink switch on the streaming horizon mode (see Distributor), for long
+    #horizons where keeping every day in memory is not an option.
+    #demand replaces the synthetic wholesalers by another demand source (e.g. TraceDemand),
+    #"vectorized" pre-generates the whole synthetic demand stream (see VectorizedDemand).
+    #cost_breakdown keeps the delivery cost per day and per product as well.
+    #scheduler picks the event queue: "heap" (default), "calendar" or a scheduler object.
+    #production="lumped" jumps over production between daily events in closed form (see
+    #LumpedProduction) instead of running one event per unit.
+    #trace names distributors whose total stock is recorded at every change, in
+    #distributor.stock_trace (for stock bands over replications, see supply_chain_bands).
+    def __init__(self, window_days=None, sink=None, demand=None, cost_breakdown=False, scheduler="heap", production="events", trace=()):
+        self.window_days = window_days
+        self.sink = sink
+
         #initialize factories
         self.factories = {}
         for name in FACTORY_PRODUCTS:
             products = FACTORY_PRODUCTS[name]
             self.factories[name] = Factory(name, products)
 
+        #production sampled in lumps at the daily events (None = one event per unit)
+        if production not in ("events", "lumped"):
+            raise ValueError("production must be 'events' or 'lumped'")
+        self.production = None
+        if production == "lumped":
+            self.production = LumpedProduction(self.factories)
+
         #initialize distributors
         self.distributors = {}
         for name in ["D1", "D2", "D3", "D4"]:
-            self.distributors[name] = Distributor(name)
+            self.distributors[name] = Distributor(name, window_days, sink, cost_breakdown)
+        for name in trace:
+            self.distributors[name].stock_trace = []
 
-        #wholesaler object
-        self.wholesalers = Wholesalers()
+        #wholesaler object (the demand source)
+        self.demand_option = demand
+        self.set_demand(demand)
 
         #priority queue for events
-        self.event_queue = []
+        self.event_queue = make_scheduler(scheduler)
+
+        #in-flight deliveries, one FIFO queue per (distributor, factory) lane. lead times are
+        #fixed per lane and deliveries are only scheduled at daily events, so each lane is
+        #already in time order and only its head has to sit in the event queue
+        self.lanes = {}
 
         #current simulation time
         self.current_time = 0
@@ -321,15 +491,63 @@ class Simulation:
         #counter to generate unique event types
         self.event_counter = 0
 
+        #seed given to reset(), kept with the results
+        self.seed = None
+
         #used later for plotting
         self.time = []
         self.stock_per_time = []
 
+    def set_demand(self, demand):
+        if demand is None:
+            demand = Wholesalers()
+        elif demand == "vectorized":
+            demand = VectorizedDemand(self.distributors, PRODUCTS, 8 * 24, END_TIME)
+        self.wholesalers = demand
+
+        #a pre-generated stream is read with a cursor in run() instead of through the event queue
+        self.demand_stream = None
+        if isinstance(demand, VectorizedDemand):
+            self.demand_stream = demand
+            self.stream_distributors = [self.distributors[name] for name in demand.distributor_names]
+
+    #back to the start for another replication, reusing the factories, distributors, event
+    #queue and lanes of this one instead of building new ones. sim.reset(seed); sim.run()
+    #gives the same results as random.seed(seed); Simulation(...).run() with the same
+    #arguments. "vectorized" demand is drawn again; a demand object passed to the
+    #constructor is replayed from its first order (restart(), see supply_chain_demand)
+    def reset(self, seed=None):
+        if seed is not None:
+            random.seed(seed)
+        self.seed = seed
+
+        for factory in self.factories.values():
+            factory.reset()
+        if self.production is not None:
+            self.production = LumpedProduction(self.factories)
+        for dist in self.distributors.values():
+            dist.reset()
+        if self.demand_option == "vectorized":
+            self.set_demand(self.demand_option)
+        elif hasattr(self.wholesalers, "restart"):
+            self.wholesalers.restart()
+
+        self.event_queue.clear()
+        for lane in self.lanes.values():
+            lane.clear()
+        self.current_time = 0
+        self.d1_stock_log.clear()
+        self.event_counter = 0
+        self.time.clear()
+        self.stock_per_time.clear()
+
+    #structured numpy result of the finished run (see supply_chain_results)
+    def result(self):
+        return RunResult.from_simulation(self, PRODUCTS, TOTAL_DAYS, self.seed)
+
     #log stock for D1 whenever a change happens
     def log_d1_stock(self, time_value):
-        total_stock = 0
-        for p in self.distributors["D1"].stock:
-            total_stock += self.distributors["D1"].stock[p]
+        total_stock = self.distributors["D1"].stock_total
 
         self.d1_stock_log.append((time_value, total_stock))
 
@@ -346,11 +564,20 @@ class Simulation:
                 self.time[-1] = time_value
                 self.stock_per_time[-1] = total_stock
 
+    #streaming mode: send the D1 logs to the sink and only keep the latest point
+    def flush_d1_logs(self, day):
+        if self.sink is not None:
+            self.sink("D1.stock_log", day, self.d1_stock_log)
+            self.sink("D1.stock_per_time", day, list(zip(self.time, self.stock_per_time)))
+        self.d1_stock_log = []
+        self.time = self.time[-1:]
+        self.stock_per_time = self.stock_per_time[-1:]
+
     #push new event into queue
     def schedule_event(self, time_value, event_type, data):
         self.event_counter += 1
         new_type = event_type + "_" + str(self.event_counter)
-        heapq.heappush(self.event_queue, (time_value, new_type, data))
+        self.event_queue.push((time_value, new_type, data))
 
     #schedule next product production for a factory
     def schedule_next_factory_production(self, factory_name, base_time):
@@ -362,20 +589,25 @@ class Simulation:
             self.schedule_event(next_time, "factory_production", event_data)
 
     #schedule a delivery event
-    def schedule_delivery(self, delivery_time, distributor, product, quantity):
+    def schedule_delivery(self, delivery_time, distributor, products, factory):
         if delivery_time <= END_TIME:
-            info = {}
-            info["distributor"] = distributor
-            info["product"] = product
-            info["quantity"] = quantity
-            self.schedule_event(delivery_time, "delivery", info)
+            lane = self.lanes.setdefault((distributor, factory), deque())
+            if lane and delivery_time < lane[-1][0]:
+                raise ValueError("delivery on lane " + factory + "-" + distributor + " scheduled out of time order")
+            lane.append((delivery_time, products))
+
+            #only the head of the lane goes into the event queue
+            if len(lane) == 1:
+                info = {}
+                info["distributor"] = distributor
+                info["factory"] = factory
+                self.schedule_event(delivery_time, "delivery", info)
 
     #schedule next wholesaler order event
     def schedule_next_wholesaler_order(self, base_time):
-        delta_hours = random.uniform(600, 3600) / 3600.0
-        next_time = base_time + delta_hours
+        next_time = self.wholesalers.next_arrival(base_time)
 
-        if next_time <= END_TIME:
+        if next_time is not None and next_time <= END_TIME:
             self.schedule_event(next_time, "wholesaler_order", {})
 
     #when a factory produces something
@@ -388,31 +620,66 @@ class Simulation:
     #when a delivery arrives at a distributor
     def handle_delivery(self, data):
         distributor_name = data["distributor"]
-        product = data["product"]
-        quantity = data["quantity"]
+        lane = self.lanes[(distributor_name, data["factory"])]
+        delivery_time, products = lane.popleft()
 
         dist = self.distributors[distributor_name]
 
         day_index = int(self.current_time // 24)
 
-        dist.receive_delivery(product, quantity, self.current_time, day_index, self.log_d1_stock)
+        dist.receive_delivery(products, self.current_time, day_index, self.log_d1_stock)
+
+        #next delivery of the lane becomes its head
+        if lane:
+            self.schedule_event(lane[0][0], "delivery", data)
+
+    #pre-generated demand: hand every order before `until` to its distributor, returns the
+    #time of the next one
+    def consume_demand(self, until):
+        stream = self.demand_stream
+        times = stream.times
+        i = stream.cursor
+        n = len(times)
+        if i >= n or times[i] >= until:
+            return times[i] if i < n else math.inf
+
+        distributors = self.stream_distributors
+        distributor_ids = stream.distributor_ids
+        products = stream.product_names
+        product_ids = stream.product_ids
+        while i < n and times[i] < until:
+            t = times[i]
+            self.current_time = t
+            distributors[distributor_ids[i]].receive_wholesaler_order(products[product_ids[i]], t, int(t // 24), self.log_d1_stock)
+            i += 1
+        stream.cursor = i
+        return times[i] if i < n else math.inf
 
     #when a wholesaler creates a random order
     def handle_wholesaler_order(self):
         day_index = int(self.current_time // 24)
-        self.wholesalers.create_order(self.distributors, self.current_time, day_index, self.log_d1_stock)
+        name, product = self.wholesalers.next_order(self.distributors)
+        self.distributors[name].receive_wholesaler_order(product, self.current_time, day_index, self.log_d1_stock)
         self.schedule_next_wholesaler_order(self.current_time)
 
     #daily event: cost calculation and sending orders
     def handle_daily_order_event(self, data):
         day = data["day"]
 
+        #lumped production: factory stock is read below, bring it up to now
+        if self.production is not None:
+            self.production.advance(self.current_time)
+
+        #streaming mode: daily events are scheduled one at a time and logs flushed every window
+        if self.window_days is not None:
+            if day + 1 < TOTAL_DAYS:
+                self.schedule_event((day + 1) * 24, "daily_order", {"day": day + 1})
+            if day % self.window_days == 0:
+                self.flush_d1_logs(day)
+
         #update stock log for plotting
         for dist in self.distributors.values():
-            total_stock = 0
-            for p in dist.stock:
-                total_stock += dist.stock[p]
-            dist.stock_total_per_day.append(total_stock)
+            dist.stock_total_per_day.append(dist.stock_total)
 
         #storage costs
         for dist in self.distributors.values():
@@ -442,26 +709,43 @@ class Simulation:
     #prepare all starting events
     def first_events(self):
         #factory production events
-        for name in self.factories:
-            self.schedule_next_factory_production(name, 0)
-
-        #daily events from day 7 to end
-        for d in range(7, TOTAL_DAYS):
-            info = {"day": d}
-            self.schedule_event(d * 24, "daily_order", info)
+        if self.production is None:
+            for name in self.factories:
+                self.schedule_next_factory_production(name, 0)
+
+        #daily events from day 7 to end (only the first one in streaming mode)
+        if self.window_days is None:
+            for d in range(7, TOTAL_DAYS):
+                info = {"day": d}
+                self.schedule_event(d * 24, "daily_order", info)
+        else:
+            self.schedule_event(7 * 24, "daily_order", {"day": 7})
 
-        #first wholesaler order at day 8
-        self.schedule_next_wholesaler_order(8 * 24)
+        #first wholesaler order at day 8 (a pre-generated stream starts there already)
+        if self.demand_stream is None:
+            self.schedule_next_wholesaler_order(8 * 24)
 
         #initial stock logging
         self.log_d1_stock(0)
+        for dist in self.distributors.values():
+            if dist.stock_trace is not None:
+                dist.stock_trace.append((0, dist.stock_total))
 
     #main loop
     def run(self):
         self.first_events()
 
+        next_order_time = math.inf
+        if self.demand_stream is not None:
+            next_order_time = self.consume_demand(0)
+
         while len(self.event_queue) > 0:
-            time_value, event_type, data = heapq.heappop(self.event_queue)
+            time_value, event_type, data = self.event_queue.pop()
+
+            #orders of a pre-generated stream never schedule events, so the ones before
+            #this event can all be handled now
+            if time_value > next_order_time:
+                next_order_time = self.consume_demand(time_value)
 
             if time_value > END_TIME:
                 break
@@ -479,39 +763,51 @@ class Simulation:
                 self.handle_wholesaler_order()
             elif base_type == "daily_order":
                 self.handle_daily_order_event(data)
+
+        if self.demand_stream is not None:
+            self.consume_demand(math.inf)
+
+        if self.production is not None:
+            self.production.advance(END_TIME)
+
+        if self.window_days is not None:
+            self.flush_d1_logs(TOTAL_DAYS)
+            for dist in self.distributors.values():
+                dist.flush_metrics()
         
 
 
 if __name__ == "__main__":
-    C = []
-    N = []
-    R = []
+    #online accumulators instead of keeping every C, N and R
+    stats = ReplicationStats()
+    #one simulation, reset for every seed
+    sim_i = Simulation()
     for i in range (100) :
-        random.seed(i) 
-        sim_i = Simulation()
+        sim_i.reset(i)
         sim_i.run()
 
         d1 = sim_i.distributors["D1"]
 
-        Ci = sum(d1.total_cost_per_day.values())
+        Ci = d1.total_cost
         Ni = sum(d1.sales_per_day[d] [p] for d in range(TOTAL_DAYS) for p in PRODUCTS)
         Ri = Ci/Ni
 
-        C.append(Ci)
-        N.append(Ni)
-        R.append(Ri)
-    
-    print("Maximum Cost C:", max(C))
-    print("Minimum Cost C:", min(C))
-    print("Average Cost C:", sum(C)/len(C))
-    print("Deviation Cost C:", np.std(C)) 
+        stats.add(C=Ci, N=Ni, R=Ri)
+
+    C = stats.moments["C"]
+    N = stats.moments["N"]
+    R = stats.moments["R"]
+    print("Maximum Cost C:", C.max)
+    print("Minimum Cost C:", C.min)
+    print("Average Cost C:", C.mean)
+    print("Deviation Cost C:", C.std()) 
     print("\n")
-    print("Maximum Number of Sales N:", max(N))
-    print("Minimum Number of Sales N:", min(N))
-    print("Average Number of Sales N:", sum(N)/len(N))
-    print("Deviation Number of Sales N:", np.std(N))
+    print("Maximum Number of Sales N:", N.max)
+    print("Minimum Number of Sales N:", N.min)
+    print("Average Number of Sales N:", N.mean)
+    print("Deviation Number of Sales N:", N.std())
     print("\n")
-    print("Maximum Ratio R:", max(R))
-    print("Minimum Ratio R:", min(R))
-    print("Average Ratio R:", sum(R)/len(R))
-    print("Deviation Ratio R:", np.std(R))
+    print("Maximum Ratio R:", R.max)
+    print("Minimum Ratio R:", R.min)
+    print("Average Ratio R:", R.mean)
+    print("Deviation Ratio R:", R.std())
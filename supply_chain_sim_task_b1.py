@@ -1,6 +1,7 @@
 import random
 import heapq
 import matplotlib.pyplot as plt
+from supply_chain_plotting import plot_step
 
 random.seed(0)
 
@@ -481,7 +482,8 @@ if __name__ == "__main__":
     for entry in d1_stock_log:
         print(entry)
     plt.figure(figsize=(12,6))
-    plt.step(sim.time, sim.stock_per_time, where='post', marker='o', label="D1 Stock", linewidth=2)
+    #downsampled to at most a few thousand points, however long the trace
+    plot_step(sim.time, sim.stock_per_time, label="D1 Stock", linewidth=2)
     plt.title("Stock of Distributor D1 with task b1")
     plt.xlabel("Hours")
     plt.ylabel("Units")
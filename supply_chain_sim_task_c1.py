@@ -1,6 +1,12 @@
+import math
 import random
-import heapq
-import numpy as np
+from collections import deque
+from supply_chain_metrics import RollingDays, RollingList
+from supply_chain_stats import ReplicationStats
+from supply_chain_scheduler import make_scheduler
+from supply_chain_demand import VectorizedDemand
+from supply_chain_production import LumpedProduction
+from supply_chain_results import RunResult
 
 # Products catalog
 PRODUCTS = [
@@ -34,6 +40,9 @@ LEAD_TIMES = {
     "D4": {"F1": 22, "F2": 13, "F3": 16.5, "F4": 18},
 }
 
+# Position of each product in the catalog, to visit touched products in catalog order
+PRODUCT_INDEX = {p: i for i, p in enumerate(PRODUCTS)}
+
 # Simulation horizon: 30 days (in hours)
 TOTAL_DAYS = 30
 END_TIME = TOTAL_DAYS * 24 # 720 hours
@@ -46,6 +55,11 @@ class Factory:
         self.products_produced = list(products)
         self.stock = {p: 0 for p in self.products_produced}
 
+    def reset(self):
+        # Back to an empty factory for a new run (Simulation.reset)
+        for p in self.stock:
+            self.stock[p] = 0
+
     def produce_one_product(self):
         # Choose a random product the factory can make and increment stock
         chosen = random.choice(self.products_produced)
@@ -54,28 +68,108 @@ class Factory:
 
 class Distributor:
     # Distributor holds inventory for all products, tracks missed orders, aggregates daily demand into factory orders, and applies lead-time priority when sourcing from factories. Postponed orders roll forward.
-    def __init__(self, name):
+    def __init__(self, name, window_days=None, sink=None, cost_breakdown=False):
         self.name = name
         self.stock = {p: 0 for p in PRODUCTS}
+        self.stock_total = 0  # running total of self.stock
+        # Products with a sale or a missed order since the last daily event; daily ordering and resets only visit these
+        self.touched = set()
         self.missed_wholesaler_orders = {p: 0 for p in PRODUCTS}
         self.orders_for_factories = []
         self.postponed_orders = []
 
-        self.sales_per_day = {d: {p: 0 for p in PRODUCTS} for d in range(TOTAL_DAYS)}
-        self.stock_total_per_day = []
-        self.cost_per_delivery_per_day = {d: {p: 0 for p in PRODUCTS} for d in range(TOTAL_DAYS)}
-        self.cost_storage_per_day = {d: 0 for d in range(TOTAL_DAYS)}
-        self.total_cost_per_day = {d: 0 for d in range(TOTAL_DAYS)}
+        # Running cost totals of the whole run (C is total_cost) and today's delivery cost
+        self.delivery_cost_total = 0
+        self.storage_cost_total = 0
+        self.total_cost = 0
+        self.delivery_cost_today = 0
+
+        # Streaming horizon mode: per-day metrics only keep the last window_days days, older days go to the sink
+        self.window_days = window_days
+        if window_days is None:
+            self.sales_per_day = {d: {p: 0 for p in PRODUCTS} for d in range(TOTAL_DAYS)}
+            self.stock_total_per_day = []
+            self.cost_storage_per_day = {d: 0 for d in range(TOTAL_DAYS)}
+            self.total_cost_per_day = {d: 0 for d in range(TOTAL_DAYS)}
+            self.missed_per_day = {d: 0 for d in range(TOTAL_DAYS)}
+        else:
+            self.sales_per_day = RollingDays(lambda: {p: 0 for p in PRODUCTS}, window_days, sink, name + ".sales_per_day")
+            self.stock_total_per_day = RollingList(window_days, sink, name + ".stock_total_per_day", first_day=7)
+            self.cost_storage_per_day = RollingDays(int, window_days, sink, name + ".cost_storage_per_day")
+            self.total_cost_per_day = RollingDays(int, window_days, sink, name + ".total_cost_per_day")
+            self.missed_per_day = RollingDays(int, window_days, sink, name + ".missed_per_day")
+
+        # Delivery cost per day and per product, only when cost_breakdown is asked for
+        self.cost_per_delivery_per_day = None
+        # (time, total stock) at every stock change, only for distributors the Simulation traces (see trace=)
+        self.stock_trace = None
+        if cost_breakdown:
+            if window_days is None:
+                self.cost_per_delivery_per_day = {d: {p: 0 for p in PRODUCTS} for d in range(TOTAL_DAYS)}
+            else:
+                self.cost_per_delivery_per_day = RollingDays(lambda: {p: 0 for p in PRODUCTS}, window_days, sink, name + ".cost_per_delivery_per_day")
+
+    def reset(self):
+        # Back to the state of a new distributor for another run, zeroing dicts and lists in place (Simulation.reset)
+        zero = dict.fromkeys(PRODUCTS, 0)
+        self.stock.update(zero)
+        self.stock_total = 0
+        self.touched.clear()
+        self.missed_wholesaler_orders.update(zero)
+        self.orders_for_factories.clear()
+        self.postponed_orders.clear()
+        if self.stock_trace is not None:
+            self.stock_trace.clear()
+        self.delivery_cost_total = 0
+        self.storage_cost_total = 0
+        self.total_cost = 0
+        self.delivery_cost_today = 0
+        if self.window_days is None:
+            for day in self.sales_per_day.values():
+                day.update(zero)
+            self.stock_total_per_day.clear()
+            for d in self.total_cost_per_day:
+                self.cost_storage_per_day[d] = 0
+                self.total_cost_per_day[d] = 0
+                self.missed_per_day[d] = 0
+            if self.cost_per_delivery_per_day is not None:
+                for day in self.cost_per_delivery_per_day.values():
+                    day.update(zero)
+        else:
+            self.sales_per_day.reset()
+            self.stock_total_per_day.reset()
+            self.cost_storage_per_day.reset()
+            self.total_cost_per_day.reset()
+            self.missed_per_day.reset()
+            if self.cost_per_delivery_per_day is not None:
+                self.cost_per_delivery_per_day.reset()
+
+    def flush_metrics(self):
+        # Streaming mode: hand everything still in memory to the sink
+        if self.window_days is not None:
+            self.sales_per_day.flush()
+            self.stock_total_per_day.flush()
+            if self.cost_per_delivery_per_day is not None:
+                self.cost_per_delivery_per_day.flush()
+            self.cost_storage_per_day.flush()
+            self.total_cost_per_day.flush()
+            self.missed_per_day.flush()
 
     def receive_wholesaler_order(self, product, current_time, day_index, log_fn):
         # Fulfill immediately if stock exists; otherwise record missed demand
         if self.stock.get(product) > 0:
             self.stock[product] -= 1
+            self.stock_total -= 1
+            self.touched.add(product)
             self.sales_per_day[day_index][product] += 1
             if self.name == "D1":
                 log_fn(current_time)
+            if self.stock_trace is not None:
+                self.stock_trace.append((current_time, self.stock_total))
         else:
             self.missed_wholesaler_orders[product] += 1
+            self.missed_per_day[day_index] += 1
+            self.touched.add(product)
 
     def plan_initial_stock_order(self, day_index):
         # On day 7, seed baseline inventory for each product
@@ -85,22 +179,27 @@ class Distributor:
 
     def calculate_storage_costs(self, day_index):
         # Storage cost is proportional to total units held that day
-        total = sum(self.stock[p] for p in PRODUCTS)
+        total = self.stock_total
         self.cost_storage_per_day[day_index] += total
+        self.storage_cost_total += total
 
     def collect_all_demand_into_orders(self, day_index):
-        # Aggregate missed demand + previous day's sales into factory orders
-        for product, missed in self.missed_wholesaler_orders.items():
+        # Aggregate missed demand + previous day's sales into factory orders (only touched products can have either)
+        for product in sorted(self.touched, key=PRODUCT_INDEX.get):
+            missed = self.missed_wholesaler_orders[product]
             sold_prev_day = self.sales_per_day[day_index - 1][product] if day_index > 0 else 0
             total_order = missed + sold_prev_day
             if total_order > 0:
                 self.orders_for_factories.append({"product": product, "quantity": total_order})
-        self.missed_wholesaler_orders = {p: 0 for p in PRODUCTS}
+            self.missed_wholesaler_orders[product] = 0
+        self.touched.clear()
 
     def send_orders_with_lead_time_priority(self, factories, day_index, current_time, schedule_delivery_fn):
         # Try to fulfill each order by pulling from the shortest lead-time
         # factory that has enough stock; otherwise postpone to next day.
         new_postponed = []
+        # fulfilled quantities per factory, shipped together as one delivery per lane
+        shipments = {}
         for order in self.orders_for_factories:
             product = order["product"]
             quantity = order["quantity"]
@@ -115,10 +214,14 @@ class Distributor:
                 if available >= quantity:
                     factories[f].stock[product] -= quantity
                     lead_hours = LEAD_TIMES[self.name][f]
-                    delivery_time = current_time + lead_hours
-                    schedule_delivery_fn(delivery_time, self.name, product, quantity)
+                    shipment = shipments.setdefault(f, {})
+                    shipment[product] = shipment.get(product, 0) + quantity
                     # cost = 10€ per hour of delivery per order
-                    self.cost_per_delivery_per_day[day_index][product] += 10 * lead_hours
+                    delivery_cost = 10 * lead_hours
+                    self.delivery_cost_today += delivery_cost
+                    self.delivery_cost_total += delivery_cost
+                    if self.cost_per_delivery_per_day is not None:
+                        self.cost_per_delivery_per_day[day_index][product] += delivery_cost
                     fulfilled = True
                     break
             if not fulfilled:
@@ -126,50 +229,130 @@ class Distributor:
                 new_postponed.append(order)
         # carry over postponed orders
         self.orders_for_factories = new_postponed
-
-    def receive_delivery(self, product, quantity, current_time, day_index, log_fn):
-        # Increase stock upon delivery and log D1 stock timeline for plotting
-        self.stock[product] += quantity
+        # one delivery event per factory -> distributor lane
+        for f, products in shipments.items():
+            delivery_time = current_time + LEAD_TIMES[self.name][f]
+            schedule_delivery_fn(delivery_time, self.name, products, f)
+
+    def receive_delivery(self, products, current_time, day_index, log_fn):
+        # Increase stock by a whole lane delivery {product: quantity} and log D1 stock timeline for plotting
+        for product, quantity in products.items():
+            self.stock[product] += quantity
+            self.stock_total += quantity
         if self.name == "D1":
             log_fn(current_time)
+        if self.stock_trace is not None:
+            self.stock_trace.append((current_time, self.stock_total))
 
     def calculate_total_costs_per_day(self, day_index):
         # Total = delivery cost (lead-time weighted) + storage cost
-        delivery_costs = sum(self.cost_per_delivery_per_day[day_index].values())
+        delivery_costs = self.delivery_cost_today
         storage_costs = self.cost_storage_per_day[day_index]
         self.total_cost_per_day[day_index] = delivery_costs + storage_costs
+        self.total_cost += delivery_costs + storage_costs
+        self.delivery_cost_today = 0
 
 
 class Wholesalers:
-    # Randomly select a distributor and product during the day, generating wholesaler demand that the distributor attempts to fulfill immediately.
-    def create_order(self, distributors, current_time, day_index, log_fn):
-        distributors_list = list(distributors.values())
-        distributor = random.choice(distributors_list)
+    # Synthetic demand source (interface in supply_chain_demand, TraceDemand replays recorded order logs instead).
+    def next_arrival(self, base_time):
+        # Random gap (uniform 600–3600s) between wholesaler orders
+        return base_time + random.uniform(600, 3600) / 3600.0
+
+    def next_order(self, distributors):
+        # Randomly select a distributor and product during the day, generating wholesaler demand that the distributor attempts to fulfill immediately.
+        distributor = random.choice(list(distributors))
         product = random.choice(PRODUCTS)
-        distributor.receive_wholesaler_order(product, current_time, day_index, log_fn)
+        return distributor, product
 
 
 class Simulation:
     # Orchestrates event-driven simulation: factory production, deliveries, wholesaler orders, and daily aggregation/costing, over 30 days.
-    def __init__(self):
+    # window_days/sink switch on the streaming horizon mode (see Distributor) for long horizons.
+    # demand replaces the synthetic wholesalers by another demand source (e.g. TraceDemand); "vectorized" pre-generates
+    # the whole synthetic demand stream (see VectorizedDemand).
+    # cost_breakdown keeps the delivery cost per day and per product as well.
+    # scheduler picks the event queue: "heap" (default), "calendar" or a scheduler object.
+    # production="lumped" jumps over production between daily events in closed form (see LumpedProduction)
+    # instead of running one event per unit.
+    # trace names distributors whose total stock is recorded at every change, in distributor.stock_trace
+    # (for stock bands over replications, see supply_chain_bands).
+    def __init__(self, window_days=None, sink=None, demand=None, cost_breakdown=False, scheduler="heap", production="events", trace=()):
+        self.window_days = window_days
+        self.sink = sink
         self.factories = {name: Factory(name, FACTORY_PRODUCTS[name]) for name in FACTORY_PRODUCTS}
-        self.distributors = {name: Distributor(name) for name in ["D1", "D2", "D3", "D4"]}
-        self.wholesalers = Wholesalers()
-        self.event_queue = []
+        if production not in ("events", "lumped"):
+            raise ValueError("production must be 'events' or 'lumped'")
+        self.production = LumpedProduction(self.factories) if production == "lumped" else None
+        self.distributors = {name: Distributor(name, window_days, sink, cost_breakdown) for name in ["D1", "D2", "D3", "D4"]}
+        for name in trace:
+            self.distributors[name].stock_trace = []
+        self.demand_option = demand
+        self.set_demand(demand)
+        self.event_queue = make_scheduler(scheduler)
+        # In-flight deliveries: one FIFO queue per (distributor, factory) lane. Fixed lead times + daily scheduling keep
+        # each lane in time order, so only lane heads sit in the event queue.
+        self.lanes = {}
         self.current_time = 0
         self.d1_stock_log = []
         self.event_counter = 0
+        self.seed = None
+
+    def set_demand(self, demand):
+        if demand == "vectorized":
+            demand = VectorizedDemand(self.distributors, PRODUCTS, 8 * 24, END_TIME)
+        self.wholesalers = demand if demand is not None else Wholesalers()
+        # A pre-generated stream is read with a cursor in run() instead of through the event queue
+        self.demand_stream = None
+        if isinstance(demand, VectorizedDemand):
+            self.demand_stream = demand
+            self.stream_distributors = [self.distributors[name] for name in demand.distributor_names]
+
+    def reset(self, seed=None):
+        # Back to the start for another replication, reusing factories, distributors, event queue and lanes:
+        # sim.reset(seed); sim.run() gives the same results as random.seed(seed); Simulation(...).run().
+        # "vectorized" demand is drawn again, a demand object passed to the constructor is replayed from its first
+        # order (restart(), see supply_chain_demand).
+        if seed is not None:
+            random.seed(seed)
+        self.seed = seed
+        for factory in self.factories.values():
+            factory.reset()
+        if self.production is not None:
+            self.production = LumpedProduction(self.factories)
+        for distributor in self.distributors.values():
+            distributor.reset()
+        if self.demand_option == "vectorized":
+            self.set_demand(self.demand_option)
+        elif hasattr(self.wholesalers, "restart"):
+            self.wholesalers.restart()
+        self.event_queue.clear()
+        for lane in self.lanes.values():
+            lane.clear()
+        self.current_time = 0
+        self.d1_stock_log.clear()
+        self.event_counter = 0
+
+    def result(self):
+        # Structured numpy result of the finished run (see supply_chain_results)
+        return RunResult.from_simulation(self, PRODUCTS, TOTAL_DAYS, self.seed)
 
     def log_d1_stock(self, time_value):
         # Track D1 total stock changes for later visualization/analysis
-        total_stock = sum(self.distributors["D1"].stock[p] for p in self.distributors["D1"].stock)
+        total_stock = self.distributors["D1"].stock_total
         self.d1_stock_log.append((time_value, total_stock))
 
+    def flush_d1_log(self, day):
+        # Streaming mode: send the D1 log to the sink and start a new one
+        if self.sink is not None:
+            self.sink("D1.stock_log", day, self.d1_stock_log)
+        self.d1_stock_log = []
+
     def schedule_event(self, time_value, event_type, data):
         # Push a new event (with unique suffix) into the priority queue
         self.event_counter += 1
         new_type = event_type + "_" + str(self.event_counter)
-        heapq.heappush(self.event_queue, (time_value, new_type, data))
+        self.event_queue.push((time_value, new_type, data))
 
     def schedule_next_factory_production(self, factory_name, base_time):
         # Next production time sampled from exponential distribution (mean 600s)
@@ -178,16 +361,20 @@ class Simulation:
         if next_time <= END_TIME:
             self.schedule_event(next_time, "factory_production", {"factory": factory_name})
 
-    def schedule_delivery(self, delivery_time, distributor, product, quantity):
-        # Delivery events occur after lead time, if still within horizon
+    def schedule_delivery(self, delivery_time, distributor, products, factory):
+        # Delivery events occur after lead time, if still within horizon; queued on their lane, only the head is an event
         if delivery_time <= END_TIME:
-            self.schedule_event(delivery_time, "delivery", {"distributor": distributor, "product": product, "quantity": quantity})
+            lane = self.lanes.setdefault((distributor, factory), deque())
+            if lane and delivery_time < lane[-1][0]:
+                raise ValueError("delivery on lane " + factory + "-" + distributor + " scheduled out of time order")
+            lane.append((delivery_time, products))
+            if len(lane) == 1:
+                self.schedule_event(delivery_time, "delivery", {"distributor": distributor, "factory": factory})
 
     def schedule_next_wholesaler_order(self, base_time):
-        # Random gap (uniform 600–3600s) between wholesaler orders
-        delta_hours = random.uniform(600, 3600) / 3600.0
-        next_time = base_time + delta_hours
-        if next_time <= END_TIME:
+        # Next arrival from the demand source, if still within horizon
+        next_time = self.wholesalers.next_arrival(base_time)
+        if next_time is not None and next_time <= END_TIME:
             self.schedule_event(next_time, "wholesaler_order", {})
 
     def handle_factory_production(self, data):
@@ -199,24 +386,56 @@ class Simulation:
     def handle_delivery(self, data):
         # Apply delivery to distributor inventory and log if D1
         dist_name = data["distributor"]
-        product = data["product"]
-        quantity = data["quantity"]
+        lane = self.lanes[(dist_name, data["factory"])]
+        delivery_time, products = lane.popleft()
         day_index = int(self.current_time // 24)
-        self.distributors[dist_name].receive_delivery(product, quantity, self.current_time, day_index, self.log_d1_stock)
+        self.distributors[dist_name].receive_delivery(products, self.current_time, day_index, self.log_d1_stock)
+        # Next delivery of the lane becomes its head
+        if lane:
+            self.schedule_event(lane[0][0], "delivery", data)
+
+    def consume_demand(self, until):
+        # Pre-generated demand: hand every order before `until` to its distributor, returns the time of the next one
+        stream = self.demand_stream
+        times = stream.times
+        i = stream.cursor
+        n = len(times)
+        if i >= n or times[i] >= until:
+            return times[i] if i < n else math.inf
+        distributors = self.stream_distributors
+        distributor_ids = stream.distributor_ids
+        products = stream.product_names
+        product_ids = stream.product_ids
+        while i < n and times[i] < until:
+            t = times[i]
+            self.current_time = t
+            distributors[distributor_ids[i]].receive_wholesaler_order(products[product_ids[i]], t, int(t // 24), self.log_d1_stock)
+            i += 1
+        stream.cursor = i
+        return times[i] if i < n else math.inf
 
     def handle_wholesaler_order(self):
         # Generate a wholesaler order and schedule the next one
         day_index = int(self.current_time // 24)
-        self.wholesalers.create_order(self.distributors, self.current_time, day_index, self.log_d1_stock)
+        name, product = self.wholesalers.next_order(self.distributors)
+        self.distributors[name].receive_wholesaler_order(product, self.current_time, day_index, self.log_d1_stock)
         self.schedule_next_wholesaler_order(self.current_time)
 
     def handle_daily_order_event(self, data):
         # Daily operations: stock totals, storage cost, initial seeding, demand aggregation, lead-time-priority sourcing, and cost tally.
         day = data["day"]
+        # lumped production: factory stock is read below, bring it up to now
+        if self.production is not None:
+            self.production.advance(self.current_time)
+        # streaming mode: schedule daily events one at a time, flush logs every window
+        if self.window_days is not None:
+            if day + 1 < TOTAL_DAYS:
+                self.schedule_event((day + 1) * 24, "daily_order", {"day": day + 1})
+            if day % self.window_days == 0:
+                self.flush_d1_log(day)
         # per-day stock total
         for distributor in self.distributors.values():
-            total_stock = sum(distributor.stock[p] for p in distributor.stock)
-            distributor.stock_total_per_day.append(total_stock)
+            distributor.stock_total_per_day.append(distributor.stock_total)
         # storage cost
         for distributor in self.distributors.values():
             distributor.calculate_storage_costs(day)
@@ -236,17 +455,29 @@ class Simulation:
 
     def first_events(self):
         # Bootstrap initial factory production, daily events, first wholesaler order, and initial D1 stock log.
-        for name in self.factories:
-            self.schedule_next_factory_production(name, 0)
-        for d in range(7, TOTAL_DAYS):
-            self.schedule_event(d * 24, "daily_order", {"day": d})
-        self.schedule_next_wholesaler_order(8 * 24)
+        if self.production is None:
+            for name in self.factories:
+                self.schedule_next_factory_production(name, 0)
+        if self.window_days is None:
+            for d in range(7, TOTAL_DAYS):
+                self.schedule_event(d * 24, "daily_order", {"day": d})
+        else:
+            self.schedule_event(7 * 24, "daily_order", {"day": 7})
+        if self.demand_stream is None:
+            self.schedule_next_wholesaler_order(8 * 24)
         self.log_d1_stock(0)
+        for distributor in self.distributors.values():
+            if distributor.stock_trace is not None:
+                distributor.stock_trace.append((0, distributor.stock_total))
 
     def run(self):
         self.first_events()
+        next_order_time = self.consume_demand(0) if self.demand_stream is not None else math.inf
         while len(self.event_queue) > 0:
-            time_value, event_type, data = heapq.heappop(self.event_queue)
+            time_value, event_type, data = self.event_queue.pop()
+            # Orders of a pre-generated stream never schedule events: handle the ones before this event now
+            if time_value > next_order_time:
+                next_order_time = self.consume_demand(time_value)
             if time_value > END_TIME:
                 break
             self.current_time = time_value
@@ -259,35 +490,44 @@ class Simulation:
                 self.handle_wholesaler_order()
             elif base_type == "daily_order":
                 self.handle_daily_order_event(data)
+        if self.demand_stream is not None:
+            self.consume_demand(math.inf)
+        if self.production is not None:
+            self.production.advance(END_TIME)
+        if self.window_days is not None:
+            self.flush_d1_log(TOTAL_DAYS)
+            for distributor in self.distributors.values():
+                distributor.flush_metrics()
 
 
 if __name__ == "__main__":
-    C = []
-    N = []
-    R = []
+    # Online accumulators instead of keeping every C, N and R
+    stats = ReplicationStats()
+    # One simulation, reset for every seed
+    sim_i = Simulation()
     for i in range(100):
-        random.seed(i)
-        sim_i = Simulation()
+        sim_i.reset(i)
         sim_i.run()
         d1 = sim_i.distributors["D1"]
-        Ci = sum(d1.total_cost_per_day.values())
+        Ci = d1.total_cost
         Ni = sum(d1.sales_per_day[d][p] for d in range(TOTAL_DAYS) for p in PRODUCTS)
         Ri = Ci / Ni if Ni > 0 else float('inf')
-        C.append(Ci)
-        N.append(Ni)
-        R.append(Ri)
-
-    print("Maximum Cost C:", max(C))
-    print("Minimum Cost C:", min(C))
-    print("Average Cost C:", sum(C) / len(C))
-    print("Deviation Cost C:", np.std(C))
+        stats.add(C=Ci, N=Ni, R=Ri)
+
+    C = stats.moments["C"]
+    N = stats.moments["N"]
+    R = stats.moments["R"]
+    print("Maximum Cost C:", C.max)
+    print("Minimum Cost C:", C.min)
+    print("Average Cost C:", C.mean)
+    print("Deviation Cost C:", C.std())
     print("\n")
-    print("Maximum Number of Sales N:", max(N))
-    print("Minimum Number of Sales N:", min(N))
-    print("Average Number of Sales N:", sum(N) / len(N))
-    print("Deviation Number of Sales N:", np.std(N))
+    print("Maximum Number of Sales N:", N.max)
+    print("Minimum Number of Sales N:", N.min)
+    print("Average Number of Sales N:", N.mean)
+    print("Deviation Number of Sales N:", N.std())
     print("\n")
-    print("Maximum Ratio R:", max(R))
-    print("Minimum Ratio R:", min(R))
-    print("Average Ratio R:", sum(R) / len(R))
-    print("Deviation Ratio R:", np.std(R))
+    print("Maximum Ratio R:", R.max)
+    print("Minimum Ratio R:", R.min)
+    print("Average Ratio R:", R.mean)
+    print("Deviation Ratio R:", R.std())
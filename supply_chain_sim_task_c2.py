@@ -1,48 +1,182 @@
-import random
-import numpy as np
+import os
+import sys
+import time
+import importlib
+from multiprocessing import Pool
 import supply_chain_sim_task_a2 as task_a
 import supply_chain_sim_task_b2 as task_b
 import supply_chain_sim_task_c1 as task_c
+from supply_chain_stats import ReplicationStats
+from supply_chain_results import ResultBatch, pack, unpack, discard
+from supply_chain_telemetry import Progress
 
 
-def experiments(task_module, seeds=range(100)):
+# One simulation per task module, Simulation options and process (pool workers keep theirs
+# between chunks), reset for every seed instead of building a new one
+_warm = {}
 
-    C, N, R = [], [], []
+
+def warm_simulation(task_module, **options):
+    key = (task_module.__name__, tuple(sorted(options.items())))
+    sim = _warm.get(key)
+    if sim is None:
+        sim = _warm[key] = task_module.Simulation(**options)
+    return sim
+
+
+def run_cells(task_module, seeds, **options):
+    # (seed, C, N, R) of D1, one run at a time. options go to Simulation (e.g. production="lumped")
+    sim = warm_simulation(task_module, **options)
 
     for seed in seeds:
-        random.seed(seed)
-        sim = task_module.Simulation()
+        sim.reset(seed)
         sim.run()
 
         d1 = sim.distributors["D1"]
-        Ci = sum(d1.total_cost_per_day.values())
-        Ni = sum(
-            d1.sales_per_day[d][p]
-            for d in range(task_module.TOTAL_DAYS)
-            for p in task_module.PRODUCTS
-        )
+        Ci = d1.total_cost
+        if d1.window_days is None:
+            Ni = sum(
+                d1.sales_per_day[d][p]
+                for d in range(task_module.TOTAL_DAYS)
+                for p in task_module.PRODUCTS
+            )
+        else:
+            # Streaming mode: the early days are flushed, the running total still has them
+            Ni = sum(d1.sales_per_day.total().values())
         Ri = Ci / Ni if Ni > 0 else float("inf")
 
-        C.append(Ci)
-        N.append(Ni)
-        R.append(Ri)
-
-    return {
-        "C_mean": float(np.mean(C)),
-        "C_std": float(np.std(C)),
-        "N_mean": float(np.mean(N)),
-        "N_std": float(np.std(N)),
-        "R_mean": float(np.mean(R)),
-        "R_std": float(np.std(R)),
-    }
+        yield seed, Ci, Ni, Ri
+
+
+def run_seeds(task_module, seeds, progress=None, **options):
+    # C, N and R of D1 go into online accumulators, nothing is kept per replication.
+    # progress (supply_chain_telemetry.Progress) gets one update per finished seed
+    stats = ReplicationStats()
+    sim = warm_simulation(task_module, **options)
+    start = time.perf_counter()
+    for seed, Ci, Ni, Ri in run_cells(task_module, seeds, **options):
+        stats.add(C=Ci, N=Ni, R=Ri)
+        if progress is not None:
+            now = time.perf_counter()
+            progress.update(1, sim.event_counter, busy=now - start)
+            start = now
+    return stats
+
+
+def _worker_tally(tally):
+    # What a pool worker sends back for the parent's Progress: (worker, events, busy seconds)
+    return os.getpid(), tally.events, tally.workers["main"][1]
+
+
+def _run_chunk(args):
+    # pool worker: modules can't be pickled, so the task module travels by name
+    module_name, seeds = args
+    tally = Progress(len(seeds), out=None, interval=float("inf"))
+    stats = run_seeds(importlib.import_module(module_name), seeds, progress=tally)
+    return stats, _worker_tally(tally)
+
+
+def _run_cells_chunk(args):
+    # pool worker: per-seed values of a block of seeds (for the journal)
+    module_name, seeds = args
+    task_module = importlib.import_module(module_name)
+    sim = warm_simulation(task_module)
+    tally = Progress(len(seeds), out=None, interval=float("inf"))
+    cells = []
+    start = time.perf_counter()
+    for cell in run_cells(task_module, seeds):
+        cells.append(cell)
+        tally.update(1, sim.event_counter, busy=time.perf_counter() - start)
+        start = time.perf_counter()
+    return cells, _worker_tally(tally)
+
+
+def run_results(task_module, seeds):
+    # Structured result of every run (per-day, per-distributor arrays), stacked into one batch
+    sim = warm_simulation(task_module)
+    results = []
+    for seed in seeds:
+        sim.reset(seed)
+        sim.run()
+        results.append(sim.result())
+    return ResultBatch.stack(results)
+
+
+def _run_results_chunk(args):
+    # pool worker: the arrays of the batch go back through shared memory (see supply_chain_results.pack)
+    module_name, seeds = args
+    return pack(run_results(importlib.import_module(module_name), seeds))
+
+
+def _chunks(task_module, seeds, workers):
+    # contiguous blocks of seeds, a few per worker
+    seeds = list(seeds)
+    n_chunks = min(len(seeds), workers * 4)
+    size = -(-len(seeds) // n_chunks)
+    return [(task_module.__name__, seeds[i:i + size]) for i in range(0, len(seeds), size)]
+
+
+def collect_results(task_module, seeds=range(100), workers=1):
+    # ResultBatch of all runs, in seed order
+    if workers <= 1:
+        return run_results(task_module, seeds)
+    chunks = _chunks(task_module, seeds, workers)
+    batches = []
+    failure = None
+    with Pool(workers) as pool:
+        frames = pool.imap(_run_results_chunk, chunks)
+        # every chunk is taken, even after a failure, so no shared memory block is left behind
+        for _ in chunks:
+            try:
+                packed = next(frames)
+            except Exception as e:
+                failure = failure or e
+                continue
+            if failure is None:
+                batches.append(unpack(packed))
+            else:
+                discard(packed)
+    if failure is not None:
+        raise failure
+    return ResultBatch.concatenate(batches)
+
+
+def experiments(task_module, seeds=range(100), workers=1, queue=None, journal=None, progress=None):
+    # progress: optional supply_chain_telemetry.Progress, updated per seed (per block of seeds
+    # with workers); not fed on the work queue, whose jobs may run on other hosts
+    if journal is not None:
+        # resumable: every finished seed goes to the journal file, seeds already in it are skipped
+        from supply_chain_journal import run_journaled
+        stats = run_journaled(journal, task_module, seeds, workers, progress=progress)
+    elif queue is not None:
+        # on the sqlite work queue (supply_chain_queue): workers local processes here, plus
+        # any started elsewhere on the same queue file. finished jobs of an earlier run are reused
+        from supply_chain_queue import run_sweep
+        seeds = list(seeds)
+        sweep = "task_c2 seeds %d..%d (%d)" % (seeds[0], seeds[-1], len(seeds))
+        stats = run_sweep(queue, sweep, {task_module.__name__: task_module}, seeds, processes=workers)[task_module.__name__]
+    elif workers <= 1:
+        stats = run_seeds(task_module, seeds, progress=progress)
+    else:
+        # each worker returns partial accumulators for a block of seeds, merged here in seed order
+        stats = ReplicationStats()
+        with Pool(workers) as pool:
+            for part, (worker, events, busy) in pool.imap(_run_chunk, _chunks(task_module, seeds, workers)):
+                stats.merge(part)
+                if progress is not None:
+                    progress.update(part.count, events, worker=worker, busy=busy)
+
+    return stats.summary()
 
 
-def main():
+def main(workers=1, queue=None, journal=None, progress=None):
     results = {
-        "Task a (Simple order strategy)": experiments(task_a),
-        "Task b (On-demand order strategy)": experiments(task_b),
-        "Task c (Order delay strategy)": experiments(task_c),
+        "Task a (Simple order strategy)": experiments(task_a, workers=workers, queue=queue, journal=journal, progress=progress),
+        "Task b (On-demand order strategy)": experiments(task_b, workers=workers, queue=queue, journal=journal, progress=progress),
+        "Task c (Order delay strategy)": experiments(task_c, workers=workers, queue=queue, journal=journal, progress=progress),
     }
+    if progress is not None:
+        progress.close()
 
     headers = ["Strategy", "C mean", "C dev", "N mean", "N dev", "R mean", "R dev"]
     first_col = max(len(headers[0]), max(len(k) for k in results.keys()))
@@ -77,4 +211,21 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    # optional arguments: number of worker processes, sqlite work queue file to run on,
+    # --journal FILE to make the run resumable, --progress for throughput / ETA lines on
+    # stderr, --progress-jsonl FILE to also append them as json lines to FILE
+    args = sys.argv[1:]
+    journal = None
+    if "--journal" in args:
+        i = args.index("--journal")
+        journal = args[i + 1]
+        del args[i:i + 2]
+    progress = None
+    if "--progress-jsonl" in args:
+        i = args.index("--progress-jsonl")
+        progress = Progress(3 * 100, label="task_c2", jsonl=args[i + 1])
+        del args[i:i + 2]
+    if "--progress" in args:
+        args.remove("--progress")
+        progress = progress or Progress(3 * 100, label="task_c2")
+    main(workers=int(args[0]) if len(args) > 0 else 1, queue=args[1] if len(args) > 1 else None, journal=journal, progress=progress)
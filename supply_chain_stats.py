@@ -0,0 +1,191 @@
+import math
+
+
+class RunningStats:
+    #online count / mean / variance (welford) / min / max of one metric. two partial
+    #results merge exactly (chan et al.), so workers can each keep one and the parent
+    #merges them: memory is O(1) in the number of replications.
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    #ddof=0 like np.std, which the tasks have always used
+    def variance(self, ddof=0):
+        if self.count - ddof <= 0:
+            return math.nan
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof=0):
+        return math.sqrt(self.variance(ddof))
+
+
+class TDigest:
+    #mergeable streaming quantile sketch (merging t-digest, k1 scale function). keeps at
+    #most about `compression` centroids, accuracy is best in the tails.
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x, weight=1):
+        self.buffer.append((x, weight))
+        self.count += weight
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        if len(self.buffer) >= 5 * self.compression:
+            self._compress()
+
+    #many values of weight 1 at once (e.g. a column of a numpy block), one buffer extend
+    #instead of one add() per value
+    def add_many(self, values):
+        values = [float(x) for x in values]
+        if not values:
+            return
+        self.buffer.extend((x, 1) for x in values)
+        self.count += len(values)
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+        if len(self.buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        other._compress()
+        self.buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _k_to_q(self, k):
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _q_to_k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(max(-1.0, min(1.0, 2 * q - 1)))
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        items = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+        total = sum(w for _, w in items)
+
+        means = []
+        weights = []
+        mean, weight = items[0]
+        done = 0
+        limit = total * self._k_to_q(self._q_to_k(0) + 1)
+        for x, w in items[1:]:
+            if done + weight + w <= limit:
+                weight += w
+                mean += (x - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                done += weight
+                limit = total * self._k_to_q(self._q_to_k(done / total) + 1)
+                mean, weight = x, w
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q):
+        self._compress()
+        if self.count == 0:
+            return math.nan
+        if len(self.means) == 1:
+            return self.means[0]
+
+        target = q * self.count
+        #centroid i is centered at (weight before it) + weights[i] / 2
+        first_center = self.weights[0] / 2
+        if target <= first_center:
+            if first_center == 0:
+                return self.min
+            return self.min + (self.means[0] - self.min) * target / first_center
+        seen = 0
+        for i in range(len(self.means) - 1):
+            center = seen + self.weights[i] / 2
+            next_center = seen + self.weights[i] + self.weights[i + 1] / 2
+            if target <= next_center:
+                return self.means[i] + (self.means[i + 1] - self.means[i]) * (target - center) / (next_center - center)
+            seen += self.weights[i]
+        last_center = self.count - self.weights[-1] / 2
+        if self.count == last_center:
+            return self.max
+        return self.means[-1] + (self.max - self.means[-1]) * (target - last_center) / (self.count - last_center)
+
+
+class ReplicationStats:
+    #online summary of per-replication metrics (by default C, N and R of the experiments)
+    def __init__(self, names=("C", "N", "R"), compression=100):
+        self.names = tuple(names)
+        self.moments = {name: RunningStats() for name in self.names}
+        self.quantiles = {name: TDigest(compression) for name in self.names}
+
+    def add(self, **values):
+        for name in self.names:
+            self.moments[name].add(values[name])
+            self.quantiles[name].add(values[name])
+
+    def merge(self, other):
+        for name in self.names:
+            self.moments[name].merge(other.moments[name])
+            self.quantiles[name].merge(other.quantiles[name])
+        return self
+
+    @property
+    def count(self):
+        return self.moments[self.names[0]].count
+
+    #flat dict: <name>_mean, _std, _min, _max, _p05, _p50, _p95
+    def summary(self):
+        out = {}
+        for name in self.names:
+            m = self.moments[name]
+            t = self.quantiles[name]
+            out[name + "_mean"] = float(m.mean)
+            out[name + "_std"] = float(m.std())
+            out[name + "_min"] = float(m.min)
+            out[name + "_max"] = float(m.max)
+            out[name + "_p05"] = float(t.quantile(0.05))
+            out[name + "_p50"] = float(t.quantile(0.5))
+            out[name + "_p95"] = float(t.quantile(0.95))
+        return out
@@ -0,0 +1,197 @@
+import os
+import sys
+import importlib
+import numpy as np
+from multiprocessing import Pool, shared_memory, util
+from supply_chain_sim_task_c2 import warm_simulation
+
+#multi-process (strategy, seed) sweeps that write their results straight into one
+#preallocated tensor per metric, indexed [strategy, seed, distributor, day]. the tensors live
+#in shared memory (or in .npy files when a directory is given, to keep them after the
+#sweep); workers attach to them by name and write their rows in place, so no result data
+#goes through the pool's pipes, only job descriptions and row counts.
+
+#metric -> dtype; sales and missed are summed over products
+TENSORS = {"cost": np.float64, "storage_cost": np.float64, "sales": np.int64, "missed": np.int64}
+
+
+class SweepResults:
+    #spec: shape and where each tensor lives (shared memory block names or .npy paths).
+    #it is small and picklable, and attach(spec) opens the same tensors in another process
+    def __init__(self, spec, create=False):
+        self.spec = spec
+        self.strategies = spec["strategies"]
+        self.seeds = spec["seeds"]
+        self.distributors = spec["distributors"]
+        self.days = spec["days"]
+        self.shape = (len(self.strategies), len(self.seeds), len(self.distributors), self.days)
+        self.blocks = []
+        self.arrays = {}
+        for name, dtype in TENSORS.items():
+            location = spec["tensors"].get(name)
+            if spec["path"] is not None:
+                mode = "w+" if create else "r+"
+                array = np.lib.format.open_memmap(location, mode=mode, dtype=dtype, shape=self.shape)
+            else:
+                if create:
+                    block = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * np.dtype(dtype).itemsize)
+                    spec["tensors"][name] = block.name
+                else:
+                    block = shared_memory.SharedMemory(name=location)
+                self.blocks.append(block)
+                array = np.ndarray(self.shape, dtype=dtype, buffer=block.buf)
+                if create:
+                    array[...] = 0
+            self.arrays[name] = array
+
+    @classmethod
+    def create(cls, strategies, seeds, distributors, days, path=None):
+        tensors = {}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            tensors = {name: os.path.join(path, name + ".npy") for name in TENSORS}
+        spec = {"strategies": list(strategies), "seeds": list(seeds), "distributors": list(distributors),
+                "days": days, "path": path, "tensors": tensors}
+        return cls(spec, create=True)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(spec)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    #rows [strategy, seed] from a RunResult
+    def write(self, strategy_index, seed_index, result):
+        self.arrays["cost"][strategy_index, seed_index] = result.cost_per_day
+        self.arrays["storage_cost"][strategy_index, seed_index] = result.storage_cost_per_day
+        self.arrays["sales"][strategy_index, seed_index] = result.sales_per_day.sum(axis=-1)
+        self.arrays["missed"][strategy_index, seed_index] = result.missed_per_day
+
+    #C, N and R of D1, [strategy, seed]
+    def kpis(self):
+        d1 = self.distributors.index("D1")
+        C = self.arrays["cost"][:, :, d1].sum(axis=-1)
+        N = self.arrays["sales"][:, :, d1].sum(axis=-1)
+        return C, N, C / N
+
+    #{strategy: {C_mean, C_std, N_mean, ...}} like task_c2.experiments (std with ddof=0)
+    def summary(self):
+        out = {}
+        for i, strategy in enumerate(self.strategies):
+            out[strategy] = {}
+            for name, values in zip(("C", "N", "R"), self.kpis()):
+                out[strategy][name + "_mean"] = float(values[i].mean())
+                out[strategy][name + "_std"] = float(values[i].std())
+        return out
+
+    #the tensors as ordinary arrays, independent of the shared memory
+    def copy(self):
+        return {name: np.array(array) for name, array in self.arrays.items()}
+
+    def close(self):
+        for array in self.arrays.values():
+            if isinstance(array, np.memmap):
+                array.flush()
+        self.arrays = {}
+        for block in self.blocks:
+            block.close()
+
+    #free the shared memory (creator only, after close); .npy files are kept
+    def unlink(self):
+        for block in self.blocks:
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+
+#the tensors of the current pool worker
+_attached = None
+
+
+def _attach(spec):
+    global _attached
+    _attached = SweepResults.attach(spec)
+    #close the worker's handles when it exits: pool workers leave through the exit hooks of
+    #multiprocessing (atexit does not run in them)
+    util.Finalize(_attached, _attached.close, exitpriority=10)
+
+
+def _run_job(results, job):
+    strategy_index, module_name, first, seeds = job
+    task_module = importlib.import_module(module_name)
+    sim = warm_simulation(task_module)
+    for k, seed in enumerate(seeds):
+        sim.reset(seed)
+        sim.run()
+        results.write(strategy_index, first + k, sim.result())
+    return len(seeds)
+
+
+def _run_job_in_worker(job):
+    return _run_job(_attached, job)
+
+
+#strategies: {label: task module}. every (strategy, seed) run lands in the tensors of the
+#returned SweepResults; close() and unlink() it (or use it as a context manager) when done.
+#if the sweep fails, the tensors are closed and unlinked before the error goes up
+def sweep(strategies, seeds=range(100), workers=1, path=None, chunk_size=None):
+    seeds = list(seeds)
+    modules = list(strategies.values())
+    probe = modules[0].Simulation()
+    results = SweepResults.create(list(strategies), seeds, list(probe.distributors), modules[0].TOTAL_DAYS, path)
+
+    #contiguous blocks of seeds per strategy, a few per worker
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(seeds) * len(modules) // (max(workers, 1) * 4)))
+    jobs = [(i, module.__name__, first, seeds[first:first + chunk_size])
+            for i, module in enumerate(modules) for first in range(0, len(seeds), chunk_size)]
+
+    try:
+        if workers <= 1:
+            for job in jobs:
+                _run_job(results, job)
+        else:
+            done = 0
+            failure = None
+            with Pool(workers, initializer=_attach, initargs=(results.spec,)) as pool:
+                #every job is waited for, even after a failure: terminating the pool while it
+                #still hands out jobs can hang
+                runs = pool.imap_unordered(_run_job_in_worker, jobs)
+                for _ in jobs:
+                    try:
+                        done += next(runs)
+                    except Exception as e:
+                        failure = failure or e
+                #let the workers exit normally, so they close their handles
+                pool.close()
+                pool.join()
+            if failure is not None:
+                raise failure
+            if done != len(seeds) * len(modules):
+                raise RuntimeError("sweep finished %d of %d runs" % (done, len(seeds) * len(modules)))
+    except BaseException:
+        results.close()
+        results.unlink()
+        raise
+    return results
+
+
+if __name__ == "__main__":
+    import supply_chain_sim_task_a2 as task_a
+    import supply_chain_sim_task_b2 as task_b
+    import supply_chain_sim_task_c1 as task_c
+
+    #python supply_chain_sweep.py [workers] [seeds]
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with sweep({"a": task_a, "b": task_b, "c": task_c}, range(n), workers) as results:
+        for strategy, s in results.summary().items():
+            print("%s | C %12.3f %10.3f | N %9.3f %8.3f | R %9.3f %8.3f"
+                  % (strategy, s["C_mean"], s["C_std"], s["N_mean"], s["N_std"], s["R_mean"], s["R_std"]))
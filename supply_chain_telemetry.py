@@ -0,0 +1,93 @@
+import sys
+import json
+import time
+
+#progress telemetry for long replication runs. runners call update() once per replication
+#or per finished batch (never per event); update() only adds to counters and emits a
+#snapshot when `interval` seconds have passed, so the cost per call is a clock read and a
+#few additions.
+#
+#a snapshot goes to the console (one line) and, if jsonl is given, as one json object per
+#line to that file (a path or an open file), for tail -f into monitoring:
+#   {"time": unix time, "label": ..., "done": replications, "total": ..., "elapsed": s,
+#    "replications_per_s": ..., "events_per_s": ..., "recent_replications_per_s": ...,
+#    "eta_s": ..., "workers": {worker: {"replications": n, "utilization": ...}}}
+#events are Simulation.event_counter summed over the finished replications. a worker's
+#utilization is its busy time over the span from the start of its first reported work to its
+#last report, so pools that come and go (one per strategy) are not counted as idle.
+
+
+class Progress:
+    def __init__(self, total, label="replications", out=sys.stderr, jsonl=None, interval=2.0):
+        self.total = total
+        self.label = label
+        self.out = out
+        self.interval = interval
+        self.own_file = isinstance(jsonl, str)
+        self.jsonl = open(jsonl, "a") if self.own_file else jsonl
+
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.last_done = 0
+        self.done = 0
+        self.events = 0
+        #worker -> [replications, busy seconds, start of first work, last report]
+        self.workers = {}
+
+    #replications / events finished since the last call; busy is the time the worker spent
+    #running them (for its utilization)
+    def update(self, replications=1, events=0, worker="main", busy=None):
+        self.done += replications
+        self.events += events
+        now = time.perf_counter()
+        w = self.workers.get(worker)
+        if w is None:
+            w = self.workers[worker] = [0, 0.0, now - (busy or 0.0), now]
+        w[0] += replications
+        if busy is not None:
+            w[1] += busy
+        w[3] = now
+        if now - self.last >= self.interval:
+            self.emit(now)
+
+    #replications that will not run after all (e.g. already in a journal)
+    def skip(self, replications):
+        self.total -= replications
+
+    def snapshot(self, now=None):
+        now = time.perf_counter() if now is None else now
+        elapsed = max(now - self.start, 1e-9)
+        rate = self.done / elapsed
+        recent = (self.done - self.last_done) / max(now - self.last, 1e-9)
+        eta = (self.total - self.done) / rate if rate > 0 and self.total else None
+        return {"time": time.time(), "label": self.label, "done": self.done, "total": self.total,
+                "elapsed": elapsed, "replications_per_s": rate, "events_per_s": self.events / elapsed,
+                "recent_replications_per_s": recent, "eta_s": eta,
+                "workers": {str(k): {"replications": w[0], "utilization": min(w[1] / max(w[3] - w[2], 1e-9), 1.0)}
+                            for k, w in self.workers.items()}}
+
+    def emit(self, now=None):
+        now = time.perf_counter() if now is None else now
+        record = self.snapshot(now)
+        self.last = now
+        self.last_done = self.done
+
+        if self.out is not None:
+            eta = "--" if record["eta_s"] is None else "%.0fs" % record["eta_s"]
+            busy = [w["utilization"] for w in record["workers"].values()]
+            util = sum(busy) / len(busy) if busy else 0.0
+            self.out.write("%s %d/%d | %.1f rep/s | %.0f events/s | %d workers %.0f%% busy | eta %s\n"
+                           % (self.label, self.done, self.total, record["replications_per_s"],
+                              record["events_per_s"], len(busy), 100 * util, eta))
+            self.out.flush()
+        if self.jsonl is not None:
+            self.jsonl.write(json.dumps(record) + "\n")
+            self.jsonl.flush()
+        return record
+
+    #last snapshot, at the end of the run
+    def close(self):
+        record = self.emit()
+        if self.own_file:
+            self.jsonl.close()
+        return record
@@ -0,0 +1,35 @@
+import io
+from supply_chain_benchmark import compare, machine
+
+
+def scenario(events_per_s, seconds, mad, peak=1000):
+    return {"events": 1000, "events_per_s": events_per_s, "peak_bytes": peak, "repeat": 5,
+            "seconds": seconds, "seconds_mad": mad, "seconds_min": seconds - mad}
+
+
+def report(**scenarios):
+    return {"machine": machine(), "scenarios": scenarios}
+
+
+def test_steady_run_within_threshold_passes():
+    baseline = report(run=scenario(1000.0, 1.0, 0.01))
+    assert compare(report(run=scenario(900.0, 1.1, 0.01)), baseline, out=io.StringIO()) == []
+
+
+def test_noisy_run_widens_the_allowed_drop():
+    #mad of 8% of the median: about 36% allowed, capped at 30%
+    baseline = report(run=scenario(1000.0, 1.0, 0.08))
+    assert compare(report(run=scenario(750.0, 1.3, 0.08)), baseline, out=io.StringIO()) == []
+
+
+def test_noisy_run_with_a_real_regression_still_fails():
+    #as noisy as it gets: the allowance stays capped at 2 * threshold
+    baseline = report(run=scenario(1000.0, 1.0, 0.5))
+    regressions = compare(report(run=scenario(600.0, 1.7, 0.9)), baseline, out=io.StringIO())
+    assert regressions == [("run", "events_per_s", 1000.0, 600.0)]
+
+
+def test_memory_growth_fails():
+    baseline = report(run=scenario(1000.0, 1.0, 0.01, peak=1000))
+    regressions = compare(report(run=scenario(1000.0, 1.0, 0.01, peak=1200)), baseline, out=io.StringIO())
+    assert regressions == [("run", "peak_bytes", 1000, 1200)]
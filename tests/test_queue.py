@@ -0,0 +1,127 @@
+import time
+import pytest
+import supply_chain_sim_task_c1 as task_c
+from supply_chain_queue import WorkQueue, run_sweep
+from supply_chain_sim_task_c2 import run_seeds
+
+TASK = "supply_chain_sim_task_c1"
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = WorkQueue(tmp_path / "queue.db", lease_seconds=0.05, max_attempts=2)
+    yield q
+    q.close()
+
+
+def cells(seeds, C):
+    return [(seed, C, 10, C / 10) for seed in seeds]
+
+
+def state(queue, job_id):
+    return queue.db.execute("select state, attempts, error from jobs where id = ?", (job_id,)).fetchone()
+
+
+def test_expired_lease_goes_to_another_worker(queue):
+    queue.submit("s", {"c": TASK}, range(2), chunk_size=2)
+    job = queue.claim("w1")
+    assert queue.claim("w2") is None
+
+    time.sleep(0.1)
+    again = queue.claim("w2")
+    assert again["id"] == job["id"]
+    assert state(queue, job["id"])[:2] == ("running", 2)
+    #the first worker lost the job
+    assert not queue.renew(job["id"], "w1")
+    assert queue.renew(job["id"], "w2")
+
+
+def test_late_duplicate_does_not_count_twice(queue):
+    queue.submit("s", {"c": TASK}, range(2), chunk_size=2)
+    job = queue.claim("w1")
+    time.sleep(0.1)
+    queue.claim("w2")
+
+    queue.complete(job["id"], "w2", cells(job["seeds"], 200))
+    #w1 comes back after its lease ran out: first result wins
+    queue.complete(job["id"], "w1", cells(job["seeds"], 100))
+    stats = queue.results("s")["c"]
+    assert stats.count == 2
+    assert stats.moments["C"].mean == 200
+
+
+def test_fail_retries_until_max_attempts(queue):
+    queue.submit("s", {"c": TASK}, range(2), chunk_size=2)
+    job = queue.claim("w1")
+    queue.fail(job["id"], "w1", "RuntimeError: first")
+    assert state(queue, job["id"])[:2] == ("pending", 1)
+
+    assert queue.claim("w2")["id"] == job["id"]
+    queue.fail(job["id"], "w2", "RuntimeError: second")
+    assert state(queue, job["id"]) == ("failed", 2, "RuntimeError: second")
+    assert queue.claim("w1") is None
+    assert queue.failures("s") == [("c", "[0, 1]", 2, "RuntimeError: second")]
+    assert queue.finished("s")
+
+
+def test_fail_from_a_worker_that_lost_the_lease_is_ignored(queue):
+    queue.submit("s", {"c": TASK}, range(2), chunk_size=2)
+    job = queue.claim("w1")
+    time.sleep(0.1)
+    queue.claim("w2")
+    queue.fail(job["id"], "w1", "RuntimeError: stale")
+    assert state(queue, job["id"]) == ("running", 2, None)
+
+
+def test_reap_fails_expired_last_attempts(queue):
+    queue.submit("s", {"c": TASK}, range(4), chunk_size=2)
+    first = queue.claim("w1")
+    queue.fail(first["id"], "w1", "RuntimeError: boom")
+    first = queue.claim("w1")
+    second = queue.claim("w1")
+    time.sleep(0.1)
+
+    #nobody claims anymore: reap() alone ends the sweep
+    assert not queue.finished("s")
+    queue.reap()
+    assert state(queue, first["id"]) == ("failed", 2, "RuntimeError: boom")
+    #an expired lease with attempts left is claimable again, not failed
+    assert state(queue, second["id"])[:2] == ("running", 1)
+    assert queue.claim("w2")["id"] == second["id"]
+
+
+def test_resubmission_skips_finished_and_queued_seeds(queue):
+    queue.submit("s", {"c": TASK}, range(4), chunk_size=2)
+    job = queue.claim("w1")
+    queue.complete(job["id"], "w1", cells(job["seeds"], 100))
+
+    #same seeds with another chunking: nothing new
+    queue.submit("s", {"c": TASK}, range(4), chunk_size=1)
+    assert queue.status("s") == {"s": {"done": 1, "pending": 1}}
+
+    #more seeds: only the new ones are queued
+    queue.submit("s", {"c": TASK}, range(6), chunk_size=3)
+    blocks = [row[0] for row in queue.db.execute("select seeds from jobs where state = 'pending' order by id")]
+    assert blocks == ["[2, 3]", "[4, 5]"]
+
+    with pytest.raises(ValueError):
+        queue.submit("s", {"c": TASK}, range(6), options={"production": "lumped"})
+
+
+def test_results_only_cover_requested_strategies_and_seeds(queue):
+    queue.submit("s", {"c": TASK, "other": TASK}, range(4), chunk_size=4)
+    for worker in ("w1", "w2"):
+        job = queue.claim(worker)
+        queue.complete(job["id"], worker, cells(job["seeds"], 100))
+    results = queue.results("s", strategies=["c"], seeds=range(3))
+    assert list(results) == ["c"]
+    assert results["c"].count == 3
+
+
+def test_run_sweep_matches_run_seeds(tmp_path):
+    results = run_sweep(tmp_path / "queue.db", "s", {"c": task_c}, range(3), processes=1, chunk_size=2, poll_seconds=0.01)
+    expected = run_seeds(task_c, range(3))
+    assert results["c"].moments["R"].mean == pytest.approx(expected.moments["R"].mean)
+    #running it again finds everything done
+    again = run_sweep(tmp_path / "queue.db", "s", {"c": task_c}, range(3), processes=0, poll_seconds=0.01)
+    assert again["c"].count == 3
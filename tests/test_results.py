@@ -0,0 +1,35 @@
+import os
+import pickle
+import numpy as np
+import supply_chain_sim_task_c1 as task_c
+from supply_chain_sim_task_c2 import run_results
+from supply_chain_results import pack, unpack, discard
+
+
+def shm_blocks():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+def test_pack_sends_arrays_out_of_band():
+    batch = run_results(task_c, range(3))
+    before = shm_blocks()
+    header, name, spans = pack(batch)
+
+    #the pickle stream only describes the arrays, their data is in the block
+    assert len(header) < sum(size for _, size in spans) / 10
+    assert len(header) < len(pickle.dumps(batch, protocol=5)) / 10
+
+    copy = unpack((header, name, spans))
+    assert shm_blocks() == before - {name}
+    for field in ("cost_per_day", "sales_per_day", "factory_stock"):
+        assert np.array_equal(getattr(copy, field), getattr(batch, field))
+    assert list(copy.seeds) == [0, 1, 2]
+    #writable, independent of the block
+    copy.sales_per_day[0] += 1
+
+
+def test_discard_frees_the_block():
+    before = shm_blocks()
+    frames = pack(run_results(task_c, range(1)))
+    discard(frames)
+    assert shm_blocks() == before
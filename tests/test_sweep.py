@@ -0,0 +1,40 @@
+import os
+import sys
+import textwrap
+import pytest
+import supply_chain_sim_task_c1 as task_c
+from supply_chain_sweep import sweep
+
+
+def shm_blocks():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+@pytest.fixture
+def failing_task(tmp_path, monkeypatch):
+    #task c whose runs raise
+    (tmp_path / "failing_task.py").write_text(textwrap.dedent("""
+        from supply_chain_sim_task_c1 import *
+        import supply_chain_sim_task_c1 as base
+
+        class Simulation(base.Simulation):
+            def run(self):
+                raise RuntimeError("run failed")
+    """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import failing_task
+    yield failing_task
+    sys.modules.pop("failing_task", None)
+
+
+def test_sweep_matches_single_process():
+    with sweep({"c": task_c}, range(4), workers=2) as parallel, sweep({"c": task_c}, range(4)) as serial:
+        assert parallel.summary() == serial.summary()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_worker_exception_leaves_no_block(failing_task, workers):
+    before = shm_blocks()
+    with pytest.raises(RuntimeError, match="run failed"):
+        sweep({"c": task_c, "failing": failing_task}, range(4), workers=workers)
+    assert shm_blocks() == before